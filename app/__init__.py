@@ -0,0 +1,4 @@
+from dotenv import load_dotenv
+
+# 加载环境变量：包初始化时执行一次，先于所有子模块读取配置
+load_dotenv()
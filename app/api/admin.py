@@ -0,0 +1,68 @@
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import PlainTextResponse
+from typing import List, Dict, Any, Optional
+import os
+import secrets
+from ..query_log import slow_query_log
+from ..profiling import profile_store
+
+router = APIRouter()
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """管理接口鉴权：请求头 X-Admin-Token 必须与 ADMIN_TOKEN 一致，未配置 ADMIN_TOKEN 时禁用"""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@router.get("/admin/slow-queries", response_model=List[Dict[str, Any]], dependencies=[Depends(require_admin)])
+async def get_slow_queries(
+    limit: int = Query(default=20, ge=1, le=500, description="返回前N个查询形状"),
+    order_by: str = Query(default="max", pattern="^(max|total)$", description="按最大耗时或累计耗时排序")
+):
+    """启动以来最慢的查询形状（含抽样的 EXPLAIN (ANALYZE, BUFFERS) 输出）"""
+    return slow_query_log.top(limit, order_by)
+
+@router.delete("/admin/slow-queries", dependencies=[Depends(require_admin)])
+async def reset_slow_queries():
+    """清空慢查询统计"""
+    slow_query_log.reset()
+    return {"status": "success"}
+
+@router.get("/admin/profiles", response_model=List[Dict[str, Any]], dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """最近采集的请求 profile（带 X-Profile 请求头或按 PROFILE_SAMPLE_RATE 抽样），最新的在前
+
+    未设置 PROFILE_DIR 时 profile 只保存在采集它的 worker 进程中，多 worker 部署时
+    列表只包含处理本次请求的 worker 的 profile（见 worker 字段）
+    """
+    return profile_store.list()
+
+@router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(
+    profile_id: str,
+    format: str = Query(default="pstats", pattern="^(pstats|text)$", description="pstats 下载 .prof 文件，text 返回文本报告"),
+    sort: str = Query(default="cumulative", pattern="^(cumulative|tottime|calls)$", description="文本报告的排序方式"),
+    limit: int = Query(default=50, ge=1, le=1000, description="文本报告的函数数"),
+):
+    """下载单个 profile：.prof 文件可用 python -m pstats 或 snakeviz 打开
+
+    未设置 PROFILE_DIR 时只有采集它的 worker 能返回，其它 worker 返回 404
+    """
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        return PlainTextResponse(profile_store.text(profile, sort, limit))
+    return Response(
+        content=profile_store.dump(profile),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'},
+    )
+
+@router.delete("/admin/profiles", dependencies=[Depends(require_admin)])
+async def clear_profiles():
+    """清空已采集的 profile"""
+    profile_store.clear()
+    return {"status": "success"}
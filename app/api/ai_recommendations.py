@@ -1,15 +1,140 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
-from ..database import get_database, Database
+from ..async_database import get_async_database, AsyncDatabase
+from ..services.snapshot_cache import snapshot_cache, current_window
+from ..encoded_response import EncodedPayload, encoded_response
+from .errors import database_error
 
 router = APIRouter()
 
+async def _load_recommendations(db: AsyncDatabase, locale: Optional[str], today_noon: datetime, tomorrow_end: datetime) -> List[Dict[str, Any]]:
+    """查询并格式化时间窗口内的推荐比赛"""
+    query = """
+    SELECT 
+        league_name,
+        home_name,
+        away_name,
+        平均赔率,
+        fixture_date,
+        推荐指数,
+        比赛预测及原因,
+        预测结果,
+        reason_dict
+    FROM ai_eval 
+    WHERE 比赛是否推荐 = 1 
+    AND 平均赔率 IS NOT NULL 
+    AND fixture_date >= %s
+    AND fixture_date <= %s
+    AND reason_dict IS NOT NULL
+    ORDER BY 推荐指数 DESC 
+    LIMIT 3
+    """
+    
+    results = await db.fetch_all(query, (today_noon, tomorrow_end), name="ai_recommendations")
+    
+    if not results:
+        return []
+    
+    # 格式化返回数据
+    formatted_results = []
+    for row in results:
+        # 解析reason_dict JSON字段
+        reason_dict = {}
+        if row.get('reason_dict'):
+            try:
+                # PostgreSQL的jsonb字段已经是dict类型，不需要json.loads
+                reason_dict = row['reason_dict'] if isinstance(row['reason_dict'], dict) else json.loads(row['reason_dict'])
+            except (json.JSONDecodeError, TypeError):
+                reason_dict = {}
+        
+        # 根据locale获取对应语言的分析内容
+        analysis_text = row['比赛预测及原因']  # 默认使用原始字段
+        if reason_dict and locale in reason_dict:
+            analysis_text = reason_dict[locale]
+        elif reason_dict and 'zh' in reason_dict:
+            # 如果没有对应语言，回退到中文
+            analysis_text = reason_dict['zh']
+        
+        formatted_results.append({
+            "id": f"{row['home_name']}-{row['away_name']}-{row['fixture_date']}",
+            "league": row['league_name'],
+            "home_team": row['home_name'],
+            "away_team": row['away_name'],
+            "odds": row['平均赔率'],
+            "fixture_date": row['fixture_date'],
+            "recommendation_index": float(row['推荐指数']) if row['推荐指数'] else 0.0,
+            "analysis": analysis_text,
+            "prediction_result": row['预测结果'],
+            "reason_dict": reason_dict  # 也返回完整的reason_dict供前端使用
+        })
+    
+    return formatted_results
+
+async def _load_compact_recommendations(db: AsyncDatabase, locale: Optional[str], today_noon: datetime, tomorrow_end: datetime) -> List[Dict[str, Any]]:
+    """精简模式：在SQL中完成语言回退（locale → zh → 比赛预测及原因），只传输选中的分析文本"""
+    query = """
+    SELECT 
+        league_name,
+        home_name,
+        away_name,
+        平均赔率,
+        fixture_date,
+        推荐指数,
+        COALESCE(reason_dict->>%s, reason_dict->>'zh', 比赛预测及原因) AS analysis,
+        预测结果
+    FROM ai_eval 
+    WHERE 比赛是否推荐 = 1 
+    AND 平均赔率 IS NOT NULL 
+    AND fixture_date >= %s
+    AND fixture_date <= %s
+    AND reason_dict IS NOT NULL
+    ORDER BY 推荐指数 DESC 
+    LIMIT 3
+    """
+    
+    results = await db.fetch_all(query, (locale or 'zh', today_noon, tomorrow_end), name="ai_recommendations_compact")
+    
+    return [
+        {
+            "id": f"{row['home_name']}-{row['away_name']}-{row['fixture_date']}",
+            "league": row['league_name'],
+            "home_team": row['home_name'],
+            "away_team": row['away_name'],
+            "odds": row['平均赔率'],
+            "fixture_date": row['fixture_date'],
+            "recommendation_index": float(row['推荐指数']) if row['推荐指数'] else 0.0,
+            "analysis": row['analysis'],
+            "prediction_result": row['预测结果'],
+        }
+        for row in results
+    ]
+
+async def recommendations_snapshot(db: AsyncDatabase, locale: Optional[str], fields: str = "full") -> List[Dict[str, Any]]:
+    """当前时间窗口（今天下午12点到明天24点）的推荐快照，经快照缓存"""
+    today_noon, tomorrow_end = current_window()
+    loader = _load_compact_recommendations if fields == "compact" else _load_recommendations
+    return await snapshot_cache.get(
+        ("ai-recommendations", today_noon, locale, fields),
+        lambda: loader(db, locale, today_noon, tomorrow_end),
+    )
+
+async def recommendations_payload(db: AsyncDatabase, locale: Optional[str], fields: str = "full") -> EncodedPayload:
+    """推荐快照的预编码响应体，随快照一起失效；数据库不可用时返回上次成功的版本"""
+    today_noon, _ = current_window()
+
+    async def encode():
+        return EncodedPayload(await recommendations_snapshot(db, locale, fields))
+
+    return await snapshot_cache.get(("ai-recommendations-encoded", today_noon, locale, fields), encode, stale_on_error=True)
+
 @router.get("/ai-recommendations", response_model=List[Dict[str, Any]])
-def get_ai_recommendations(
+async def get_ai_recommendations(
+    request: Request,
     locale: Optional[str] = Query(default="zh", description="用户语言设置"),
-    db: Database = Depends(get_database)
+    fields: str = Query(default="full", pattern="^(full|compact)$", description="返回字段：full 含完整 reason_dict，compact 只含所选语言的分析"),
+    db: AsyncDatabase = Depends(get_async_database)
 ):
     """
     获取AI最有把握的投注推荐
@@ -18,83 +143,21 @@ def get_ai_recommendations(
     - 推荐指数前3条
     - 平均赔率不为空
     - 比赛时间：今天下午到明天24点
+    fields=compact 时不返回 reason_dict，语言选择在SQL中完成
+    响应体按快照预编码（ETag / If-None-Match 304，gzip/br 压缩）
     """
     try:
-        # 计算时间范围：今天下午12点到明天24点
-        now = datetime.now()
-        today_noon = now.replace(hour=12, minute=0, second=0, microsecond=0)
-        tomorrow_end = (now + timedelta(days=1)).replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        query = """
-        SELECT 
-            league_name,
-            home_name,
-            away_name,
-            平均赔率,
-            fixture_date,
-            推荐指数,
-            比赛预测及原因,
-            预测结果,
-            reason_dict
-        FROM ai_eval 
-        WHERE 比赛是否推荐 = 1 
-        AND 平均赔率 IS NOT NULL 
-        AND fixture_date >= %s
-        AND fixture_date <= %s
-        AND reason_dict IS NOT NULL
-        ORDER BY 推荐指数 DESC 
-        LIMIT 3
-        """
-        
-        results = db.fetch_all(query, (today_noon, tomorrow_end))
-        
-        if not results:
-            return []
-        
-        # 格式化返回数据
-        formatted_results = []
-        for row in results:
-            # 解析reason_dict JSON字段
-            reason_dict = {}
-            if row.get('reason_dict'):
-                try:
-                    # PostgreSQL的jsonb字段已经是dict类型，不需要json.loads
-                    reason_dict = row['reason_dict'] if isinstance(row['reason_dict'], dict) else json.loads(row['reason_dict'])
-                except (json.JSONDecodeError, TypeError):
-                    reason_dict = {}
-            
-            # 根据locale获取对应语言的分析内容
-            analysis_text = row['比赛预测及原因']  # 默认使用原始字段
-            if reason_dict and locale in reason_dict:
-                analysis_text = reason_dict[locale]
-            elif reason_dict and 'zh' in reason_dict:
-                # 如果没有对应语言，回退到中文
-                analysis_text = reason_dict['zh']
-            
-            formatted_results.append({
-                "id": f"{row['home_name']}-{row['away_name']}-{row['fixture_date']}",
-                "league": row['league_name'],
-                "home_team": row['home_name'],
-                "away_team": row['away_name'],
-                "odds": row['平均赔率'],
-                "fixture_date": row['fixture_date'],
-                "recommendation_index": float(row['推荐指数']) if row['推荐指数'] else 0.0,
-                "analysis": analysis_text,
-                "prediction_result": row['预测结果'],
-                "reason_dict": reason_dict  # 也返回完整的reason_dict供前端使用
-            })
-        
-        return formatted_results
+        return encoded_response(request, await recommendations_payload(db, locale, fields))
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        raise database_error(e)
 
 @router.get("/ai-recommendations/test")
-def test_connection(db: Database = Depends(get_database)):
+async def test_connection(db: AsyncDatabase = Depends(get_async_database)):
     """测试数据库连接"""
     try:
         # 测试简单查询
-        result = db.fetch_one("SELECT 1 as test")
+        result = await db.fetch_one("SELECT 1 as test", name="ping")
         return {"status": "success", "message": "Database connection successful", "test_result": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,17 @@
+import math
+from fastapi import HTTPException
+from ..circuit_breaker import CircuitOpenError
+
+
+def database_error(e: Exception) -> HTTPException:
+    """数据库访问失败对应的 HTTP 错误
+
+    熔断中（且没有可用的旧快照）快速返回 503 和 Retry-After，不等待连接超时；其它错误返回 500。
+    """
+    if isinstance(e, CircuitOpenError):
+        return HTTPException(
+            status_code=503,
+            detail="Database temporarily unavailable",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    return HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -0,0 +1,178 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, AsyncIterator
+from datetime import datetime
+import asyncio
+import csv
+from contextlib import aclosing
+import io
+import logging
+import os
+import orjson
+from ..async_database import get_async_database, AsyncDatabase
+from ..encoded_response import _default
+from ..sql import float8_or_null
+from .admin import require_admin
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = [
+    "id", "fixture_date", "league_name", "home_name", "away_name",
+    "home_odds", "draw_odds", "away_odds",
+    "recommendation_index", "prediction_result", "recommended", "analysis", "reason_dict",
+]
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+# 每个导出占用一条池连接，限制同时进行的导出数，避免挤占 API 查询
+_export_slots = asyncio.Semaphore(int(os.getenv("EXPORT_MAX_CONCURRENCY", "2")))
+
+
+def _odds(key: str) -> str:
+    """平均赔率中的值格式不对时导出 NULL，而不是让整个导出在中途失败"""
+    return float8_or_null(f"平均赔率->>'{key}'")
+
+
+class _ExportSlot:
+    """已占用的导出名额，只归还一次"""
+
+    def __init__(self):
+        self._held = True
+
+    def release(self) -> None:
+        if self._held:
+            self._held = False
+            _export_slots.release()
+
+
+class _ExportResponse(StreamingResponse):
+    """响应结束时归还导出名额：客户端在开始发送数据前断开时生成器不会运行，由这里兜底"""
+
+    def __init__(self, content, slot: _ExportSlot, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+def _build_query(
+    start: Optional[datetime],
+    end: Optional[datetime],
+    leagues: Optional[List[str]],
+    recommended: Optional[bool],
+):
+    conditions = []
+    params: list = []
+    if start is not None:
+        conditions.append("fixture_date >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("fixture_date <= %s")
+        params.append(end)
+    if leagues:
+        conditions.append("league_name = ANY(%s)")
+        params.append(leagues)
+    if recommended is not None:
+        conditions.append("比赛是否推荐 = 1" if recommended else "比赛是否推荐 IS DISTINCT FROM 1")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
+    SELECT
+        id,
+        fixture_date,
+        league_name,
+        home_name,
+        away_name,
+        {_odds('home_avg')},
+        {_odds('draw_avg')},
+        {_odds('away_avg')},
+        推荐指数::float8,
+        预测结果,
+        比赛是否推荐,
+        比赛预测及原因,
+        reason_dict
+    FROM ai_eval
+    {where}
+    ORDER BY fixture_date ASC, id ASC
+    """
+    return query, params
+
+async def _ndjson(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    dumps = orjson.dumps
+    option = orjson.OPT_APPEND_NEWLINE
+    async for rows in batches:
+        yield b"".join(dumps(dict(zip(EXPORT_COLUMNS, row)), default=_default, option=option) for row in rows)
+
+async def _csv(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM 让 Excel 正确识别 UTF-8 中的中文
+    writer.writerow(EXPORT_COLUMNS)
+    yield "\ufeff".encode() + buffer.getvalue().encode()
+    async for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            reason_dict = row[-1]
+            writer.writerow((*row[:-1], orjson.dumps(reason_dict).decode() if reason_dict is not None else ""))
+        yield buffer.getvalue().encode()
+
+async def _guarded(chunks: AsyncIterator[bytes], batches: AsyncIterator[list], slot: _ExportSlot) -> AsyncIterator[bytes]:
+    """逐块发送，结束后归还导出名额；中断时立即关闭游标归还连接
+
+    响应头已发出后出错只能截断输出，记录日志。
+    """
+    try:
+        async with aclosing(batches), aclosing(chunks):
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            except Exception as e:
+                logger.error(f"导出中断: {e}")
+                raise
+    finally:
+        slot.release()
+
+@router.get("/export/ai-eval", dependencies=[Depends(require_admin)])
+async def export_ai_eval(
+    start: Optional[datetime] = Query(default=None, description="开赛时间下限"),
+    end: Optional[datetime] = Query(default=None, description="开赛时间上限"),
+    league: Optional[List[str]] = Query(default=None, description="联赛名称，可重复传入多个"),
+    recommended: Optional[bool] = Query(default=None, description="true 只导出推荐的比赛，false 只导出未推荐的"),
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$", description="导出格式"),
+    db: AsyncDatabase = Depends(get_async_database)
+):
+    """
+    流式导出 ai_eval 历史数据（需要 X-Admin-Token）
+    - 任意开赛时间范围，可按联赛和是否推荐筛选，按 (fixture_date, id) 排序
+    - 服务端命名游标分批读取，边读边发送，内存占用与导出行数无关
+    """
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    # 名额未满时 acquire 不会挂起，检查与占用之间没有其它请求插入；已满时直接拒绝而不是排队
+    if _export_slots.locked():
+        raise HTTPException(status_code=429, detail="Too many exports in progress")
+    await _export_slots.acquire()
+    slot = _ExportSlot()
+
+    try:
+        query, params = _build_query(start, end, league, recommended)
+        batches = db.stream(query, params, name="export_ai_eval", batch_size=EXPORT_BATCH_SIZE)
+        if format == "csv":
+            chunks, media_type = _csv(batches), "text/csv; charset=utf-8"
+        else:
+            chunks, media_type = _ndjson(batches), "application/x-ndjson"
+
+        span = f"{start.date() if start else 'all'}_{end.date() if end else 'all'}"
+        return _ExportResponse(
+            _guarded(chunks, batches, slot),
+            slot,
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="ai_eval_{span}.{format}"'},
+        )
+    except BaseException:
+        slot.release()
+        raise
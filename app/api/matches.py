@@ -1,105 +1,239 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
-from ..database import get_database, Database
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from datetime import datetime
+import base64
+import json
+from ..async_database import get_async_database, AsyncDatabase
+from ..services.snapshot_cache import snapshot_cache, current_window
+from ..encoded_response import EncodedPayload, encoded_response
+from .errors import database_error
+from ..sql import float8_or_null
 
 router = APIRouter()
 
+# AI预测结果的中文显示
+PREDICTION_LABELS = {
+    'home': '主胜',
+    'away': '客胜',
+    'draw': '平局'
+}
+
+# 赔率在SQL中直接取出为 float8，避免在Python中解码整个 平均赔率 JSONB；
+# 空字符串或非数字的赔率取出为 NULL（格式化时为 0），不会让整个时间窗口查询失败；
+# 推荐指数 转为 float8，避免逐行构造 Decimal；id 仅用于分页游标
+MATCHES_COLUMNS = f"""
+    league_name,
+    home_name,
+    away_name,
+    {float8_or_null("平均赔率->>'home_avg'")},
+    {float8_or_null("平均赔率->>'draw_avg'")},
+    {float8_or_null("平均赔率->>'away_avg'")},
+    fixture_date,
+    推荐指数::float8,
+    比赛预测及原因,
+    预测结果,
+    比赛是否推荐,
+    id
+"""
+
+MATCHES_QUERY = f"""
+SELECT {MATCHES_COLUMNS}
+FROM ai_eval 
+WHERE 平均赔率 IS NOT NULL 
+AND fixture_date >= %s
+AND fixture_date <= %s
+ORDER BY fixture_date ASC, id ASC
+"""
+
+MAX_PAGE_SIZE = 500
+
+def _format_matches(rows: Sequence[Tuple]) -> List[Dict[str, Any]]:
+    """格式化 MATCHES_COLUMNS 元组行
+
+    元组行按位置解包，不经过中间 dict；同一开赛时间的日期/时间字符串只格式化一次
+    """
+    # 开赛时间 -> (日期, 时间, id后缀)，同一时间开赛的比赛共用
+    time_cache: Dict[Any, tuple] = {}
+    formatted_results = []
+    append = formatted_results.append
+    for (league, home, away, home_odds, draw_odds, away_odds, fixture_date,
+         recommendation_index, analysis, prediction, recommended, _row_id) in rows:
+        times = time_cache.get(fixture_date)
+        if times is None:
+            if fixture_date:
+                times = (fixture_date.strftime('%m-%d'), fixture_date.strftime('%H:%M'), str(fixture_date))
+            else:
+                times = ('', '', str(fixture_date))
+            time_cache[fixture_date] = times
+        match_date, match_time, fixture_key = times
+        
+        # AI预测信息，如果有推荐指数，添加到AI预测中
+        ai_prediction = ""
+        if prediction:
+            ai_prediction = PREDICTION_LABELS.get(prediction, prediction)
+            if recommendation_index:
+                ai_prediction += f" {recommendation_index * 100:.0f}%"
+        
+        append({
+            "id": f"{home}-{away}-{fixture_key}",
+            "date": match_date,
+            "time": match_time,
+            "league": league,
+            "home_team": home,
+            "away_team": away,
+            "home_odds": round(home_odds, 2) if home_odds else 0,
+            "draw_odds": round(draw_odds, 2) if draw_odds else 0,
+            "away_odds": round(away_odds, 2) if away_odds else 0,
+            "ai_prediction": ai_prediction,
+            "is_recommended": bool(recommended),
+            "analysis": analysis,
+            "fixture_date": fixture_date,
+            "recommendation_index": recommendation_index if recommendation_index else 0.0
+        })
+    
+    return formatted_results
+
+async def _load_matches(db: AsyncDatabase, today_noon: datetime, tomorrow_end: datetime) -> List[Dict[str, Any]]:
+    """查询并格式化时间窗口内的比赛数据"""
+    rows = await db.fetch_rows(MATCHES_QUERY, (today_noon, tomorrow_end), name="matches")
+    return _format_matches(rows)
+
+def _encode_cursor(fixture_date: datetime, row_id: Any) -> str:
+    raw = json.dumps([fixture_date.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        fixture_date, row_id = json.loads(raw)
+        fixture_date = datetime.fromisoformat(fixture_date)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # id 直接进入 (fixture_date, id) > (%s, %s) 比较，非整数会在数据库中报错
+    if not isinstance(row_id, int) or isinstance(row_id, bool):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return fixture_date, row_id
+
+async def _load_matches_page(
+    db: AsyncDatabase,
+    leagues: Optional[List[str]],
+    kickoff_from: datetime,
+    kickoff_to: datetime,
+    recommended_only: bool,
+    min_index: Optional[float],
+    limit: int,
+    cursor: Optional[str],
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """筛选与 keyset 分页全部下推到SQL，按 (fixture_date, id) 排序"""
+    conditions = ["平均赔率 IS NOT NULL", "fixture_date >= %s", "fixture_date <= %s"]
+    params: List[Any] = [kickoff_from, kickoff_to]
+    if leagues:
+        conditions.append("league_name = ANY(%s)")
+        params.append(leagues)
+    if recommended_only:
+        conditions.append("比赛是否推荐 = 1")
+    if min_index is not None:
+        conditions.append("推荐指数 >= %s")
+        params.append(min_index)
+    if cursor:
+        conditions.append("(fixture_date, id) > (%s, %s)")
+        params.extend(_decode_cursor(cursor))
+    # 多取一行判断是否还有下一页
+    params.append(limit + 1)
+
+    query = f"""
+    SELECT {MATCHES_COLUMNS}
+    FROM ai_eval
+    WHERE {" AND ".join(conditions)}
+    ORDER BY fixture_date ASC, id ASC
+    LIMIT %s
+    """
+    rows = await db.fetch_rows(query, params, name="matches_page")
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(last[6], last[11])
+    return _format_matches(rows), next_cursor
+
+async def matches_snapshot(db: AsyncDatabase) -> List[Dict[str, Any]]:
+    """当前时间窗口（今天下午12点到明天24点）的比赛快照，经快照缓存"""
+    today_noon, tomorrow_end = current_window()
+    return await snapshot_cache.get(
+        ("matches", today_noon),
+        lambda: _load_matches(db, today_noon, tomorrow_end),
+    )
+
+async def matches_payload(db: AsyncDatabase) -> EncodedPayload:
+    """比赛快照的预编码响应体，随快照一起失效；数据库不可用时返回上次成功的版本"""
+    today_noon, _ = current_window()
+
+    async def encode():
+        return EncodedPayload(await matches_snapshot(db))
+
+    return await snapshot_cache.get(("matches-encoded", today_noon), encode, stale_on_error=True)
+
 @router.get("/matches", response_model=List[Dict[str, Any]])
-def get_matches(db: Database = Depends(get_database)):
+async def get_matches(
+    request: Request,
+    league: Optional[List[str]] = Query(default=None, description="联赛名称，可重复传入多个"),
+    kickoff_from: Optional[datetime] = Query(default=None, description="开赛时间下限，默认今天下午12点"),
+    kickoff_to: Optional[datetime] = Query(default=None, description="开赛时间上限，默认明天24点"),
+    recommended: bool = Query(default=False, description="只返回推荐的比赛"),
+    min_index: Optional[float] = Query(default=None, ge=0, le=1, description="最低推荐指数"),
+    limit: Optional[int] = Query(
+        default=None, ge=1, le=MAX_PAGE_SIZE,
+        description=f"每页条数，传入后启用分页；只传筛选参数时默认 {MAX_PAGE_SIZE}，超出部分见 X-Next-Cursor",
+    ),
+    cursor: Optional[str] = Query(default=None, description="上一页响应头 X-Next-Cursor 的值"),
+    db: AsyncDatabase = Depends(get_async_database)
+):
     """
     获取所有比赛数据
     从ai_eval表中筛选：
     - 平均赔率不为空
     - 比赛时间：今天下午到明天24点
     返回格式：日期、时间、联赛、对阵、主胜、平、客胜、AI、操作
+    不带筛选参数时响应体按快照预编码（ETag / If-None-Match 304，gzip/br 压缩）
+    带筛选或分页参数时直接查询，下一页游标在响应头 X-Next-Cursor 中；
+    只传筛选参数、不传 limit 时同样分页，每页最多 500 条，
+    超出部分需按 X-Next-Cursor 继续获取（自定义开赛时间范围可能很大，不返回无上限的结果）
     """
     try:
-        # 计算时间范围：今天下午12点到明天24点
-        now = datetime.now()
-        today_noon = now.replace(hour=12, minute=0, second=0, microsecond=0)
-        tomorrow_end = (now + timedelta(days=1)).replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        query = """
-        SELECT 
-            league_name,
-            home_name,
-            away_name,
-            平均赔率,
-            fixture_date,
-            推荐指数,
-            比赛预测及原因,
-            预测结果,
-            比赛是否推荐
-        FROM ai_eval 
-        WHERE 平均赔率 IS NOT NULL 
-        AND fixture_date >= %s
-        AND fixture_date <= %s
-        ORDER BY fixture_date ASC
-        """
-        
-        results = db.fetch_all(query, (today_noon, tomorrow_end))
-        
-        if not results:
-            return []
-        
-        # 格式化返回数据
-        formatted_results = []
-        for row in results:
-            # 解析平均赔率JSON
-            odds_data = row['平均赔率']
-            home_odds = odds_data.get('home_avg', 0) if odds_data else 0
-            draw_odds = odds_data.get('draw_avg', 0) if odds_data else 0
-            away_odds = odds_data.get('away_avg', 0) if odds_data else 0
-            
-            # 格式化日期和时间
-            fixture_datetime = row['fixture_date']
-            match_date = fixture_datetime.strftime('%m-%d') if fixture_datetime else ''
-            match_time = fixture_datetime.strftime('%H:%M') if fixture_datetime else ''
-            
-            # AI预测信息
-            ai_prediction = ""
-            if row['预测结果']:
-                prediction_map = {
-                    'home': '主胜',
-                    'away': '客胜', 
-                    'draw': '平局'
-                }
-                ai_prediction = prediction_map.get(row['预测结果'], row['预测结果'])
-                
-                # 如果有推荐指数，添加到AI预测中
-                if row['推荐指数']:
-                    confidence = float(row['推荐指数']) * 100
-                    ai_prediction += f" {confidence:.0f}%"
-            
-            formatted_results.append({
-                "id": f"{row['home_name']}-{row['away_name']}-{row['fixture_date']}",
-                "date": match_date,
-                "time": match_time,
-                "league": row['league_name'],
-                "home_team": row['home_name'],
-                "away_team": row['away_name'],
-                "home_odds": round(home_odds, 2) if home_odds else 0,
-                "draw_odds": round(draw_odds, 2) if draw_odds else 0,
-                "away_odds": round(away_odds, 2) if away_odds else 0,
-                "ai_prediction": ai_prediction,
-                "is_recommended": bool(row['比赛是否推荐']),
-                "analysis": row['比赛预测及原因'],
-                "fixture_date": row['fixture_date'],
-                "recommendation_index": float(row['推荐指数']) if row['推荐指数'] else 0.0
-            })
-        
-        return formatted_results
+        filtered = (
+            league or kickoff_from or kickoff_to or recommended
+            or min_index is not None or limit is not None or cursor
+        )
+        if not filtered:
+            return encoded_response(request, await matches_payload(db))
+
+        window_start, window_end = current_window()
+        items, next_cursor = await _load_matches_page(
+            db,
+            league,
+            kickoff_from or window_start,
+            kickoff_to or window_end,
+            recommended,
+            min_index,
+            limit or MAX_PAGE_SIZE,
+            cursor,
+        )
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return JSONResponse(content=jsonable_encoder(items), headers=headers)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        raise database_error(e)
 
 @router.get("/matches/test")
-def test_matches_connection(db: Database = Depends(get_database)):
+async def test_matches_connection(db: AsyncDatabase = Depends(get_async_database)):
     """测试matches API连接"""
     try:
         # 测试查询
-        result = db.fetch_one("SELECT COUNT(*) as count FROM ai_eval WHERE 平均赔率 IS NOT NULL")
+        result = await db.fetch_one("SELECT COUNT(*) as count FROM ai_eval WHERE 平均赔率 IS NOT NULL", name="matches_count")
         return {"status": "success", "message": "Matches API connection successful", "total_matches": result['count'] if result else 0}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, Query, Request
+from typing import Optional
+from ..async_database import get_async_database, AsyncDatabase
+from ..services.snapshot_cache import snapshot_cache
+from ..services.stats import load_accuracy, DIMENSIONS
+from ..encoded_response import EncodedPayload, encoded_response
+from .errors import database_error
+
+router = APIRouter()
+
+@router.get("/stats/accuracy")
+async def get_accuracy(
+    request: Request,
+    dimension: Optional[str] = Query(
+        default=None,
+        pattern=f"^({'|'.join(DIMENSIONS)})$",
+        description="统计维度：overall / league / index（推荐指数区间）/ odds（所选结果的赔率区间）/ recommended，不传返回全部",
+    ),
+    db: AsyncDatabase = Depends(get_async_database)
+):
+    """
+    预测结果命中率统计（只统计已结算的比赛）
+    读取增量维护的汇总表，耗时只与桶数有关；结果经快照缓存并预编码
+    """
+    async def encode():
+        return EncodedPayload(await load_accuracy(db, dimension))
+
+    try:
+        payload = await snapshot_cache.get(("stats-accuracy", dimension), encode)
+        return encoded_response(request, payload)
+
+    except Exception as e:
+        raise database_error(e)
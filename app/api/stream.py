@@ -0,0 +1,98 @@
+from fastapi import APIRouter, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import Dict, Optional
+import asyncio
+import json
+import os
+from ..async_database import async_database
+from ..services.snapshot_cache import snapshot_cache
+from ..services.change_feed import ChangeFeed
+from .matches import matches_snapshot
+from .ai_recommendations import recommendations_snapshot
+from .errors import database_error
+
+router = APIRouter()
+
+REFRESH_INTERVAL = float(os.getenv("STREAM_REFRESH_INTERVAL", "60"))
+HEARTBEAT_INTERVAL = float(os.getenv("STREAM_HEARTBEAT_INTERVAL", "15"))
+
+# 每个数据集一个共享变更流（推荐按语言区分）
+matches_feed = ChangeFeed(
+    "matches",
+    lambda: matches_snapshot(async_database),
+    snapshot_cache,
+    refresh_interval=REFRESH_INTERVAL,
+)
+recommendation_feeds: Dict[str, ChangeFeed] = {}
+MAX_RECOMMENDATION_FEEDS = 32
+
+
+def _recommendation_feed(locale: str) -> ChangeFeed:
+    feed = recommendation_feeds.get(locale)
+    if feed is None and len(recommendation_feeds) >= MAX_RECOMMENDATION_FEEDS:
+        locale = "zh"
+        feed = recommendation_feeds.get(locale)
+    if feed is None:
+        feed = ChangeFeed(
+            f"ai-recommendations:{locale}",
+            lambda: recommendations_snapshot(async_database, locale, "compact"),
+            snapshot_cache,
+            refresh_interval=REFRESH_INTERVAL,
+        )
+        recommendation_feeds[locale] = feed
+    return feed
+
+
+def _sse(event: str, data) -> str:
+    payload = json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def _event_stream(request: Request, feed: ChangeFeed) -> StreamingResponse:
+    try:
+        queue = await feed.subscribe()
+    except Exception as e:
+        raise database_error(e)
+
+    async def generate():
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # 心跳，避免代理断开空闲连接
+                    yield ": ping\n\n"
+                    continue
+                if event == "close":
+                    break
+                yield _sse(event, data)
+        finally:
+            feed.unsubscribe(queue)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stream/matches")
+async def stream_matches(request: Request):
+    """
+    比赛数据的 Server-Sent Events 流
+    - 连接后先发送 snapshot 事件（与 /api/matches 相同的列表）
+    - 之后 ai_eval 变化时发送 diff 事件：{"added": [...], "changed": [...], "removed": [id, ...]}
+    """
+    return await _event_stream(request, matches_feed)
+
+
+@router.get("/stream/ai-recommendations")
+async def stream_ai_recommendations(
+    request: Request,
+    locale: Optional[str] = Query(default="zh", pattern="^[A-Za-z_-]{2,16}$", description="用户语言设置"),
+):
+    """推荐比赛的 Server-Sent Events 流（compact 字段），事件格式同 /stream/matches"""
+    return await _event_stream(request, _recommendation_feed(locale or "zh"))
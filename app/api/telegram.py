@@ -1,7 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Header, Depends
+from typing import Optional
+import asyncio
+import secrets
 from pydantic import BaseModel
 from ..services.telegram_service import telegram_service
+from ..services.leader import leader_elector
+from ..async_database import async_database
 import logging
+from .errors import database_error
+from .admin import require_admin
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -10,28 +17,85 @@ class BindingSuccessRequest(BaseModel):
     chat_id: int
     user_name: str
 
-@router.post("/telegram/binding-success")
+@router.post("/telegram/binding-success", status_code=202)
 async def handle_binding_success(request: BindingSuccessRequest):
-    """处理绑定成功通知"""
+    """处理绑定成功通知：在数据库中认领 chat_id 并写入投递队列后立即返回 202，由后台 worker 限速发送
+
+    同一 chat_id 重复提交（客户端重试，包括落到其它 worker）不会重复发送，返回已有的投递状态；
+    notification_deliveries 表不存在（未执行 python -m app.migrate）或数据库不可用时只在本 worker 内去重
+    """
+    if not telegram_service.notifications.running:
+        raise HTTPException(status_code=503, detail="Telegram bot is not running")
     try:
-        success = await telegram_service.send_binding_success_message(
-            request.chat_id, 
-            request.user_name
-        )
-        
-        if success:
-            return {"status": "success", "message": "Binding success message sent"}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to send message")
-            
+        delivery, created = await telegram_service.queue_binding_success(request.chat_id, request.user_name)
+    except asyncio.QueueFull:
+        logger.warning("绑定成功通知队列已满")
+        raise HTTPException(status_code=503, detail="Notification queue is full", headers={"Retry-After": "5"})
     except Exception as e:
-        logger.error(f"处理绑定成功通知失败: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error(f"绑定成功通知入队失败: {e}")
+        raise HTTPException(status_code=503, detail="Notification store unavailable")
+    return {"status": "accepted", "duplicate": not created, "delivery": delivery}
+
+@router.get("/telegram/binding-success/{chat_id}")
+async def get_binding_success(chat_id: int):
+    """查询绑定成功通知的投递状态"""
+    try:
+        delivery = await telegram_service.notifications.get(f"binding-success:{chat_id}")
+    except Exception as e:
+        raise database_error(e)
+    if delivery is None:
+        raise HTTPException(status_code=404, detail="Delivery not found")
+    return delivery
+
+@router.post("/telegram/webhook")
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: Optional[str] = Header(default=None),
+):
+    """接收 Telegram webhook 更新（TELEGRAM_MODE=webhook）"""
+    if not telegram_service.webhook_ready:
+        raise HTTPException(status_code=503, detail="Webhook mode is not active")
+    if not x_telegram_bot_api_secret_token or not secrets.compare_digest(
+        x_telegram_bot_api_secret_token, telegram_service.webhook_secret
+    ):
+        raise HTTPException(status_code=403, detail="Invalid secret token")
+    
+    await telegram_service.process_webhook_update(await request.json())
+    return {"ok": True}
 
 @router.get("/telegram/status")
 async def get_telegram_status():
     """获取 Telegram bot 状态"""
+    try:
+        leader = await leader_elector.current_leader(async_database)
+    except Exception as e:
+        logger.error(f"查询 leader 失败: {e}")
+        leader = None
     return {
         "status": "running" if telegram_service.bot_instance else "stopped",
-        "bot_token_configured": bool(telegram_service.bot_token)
-    }
\ No newline at end of file
+        "mode": telegram_service.mode,
+        "bot_token_configured": bool(telegram_service.bot_token),
+        "worker_id": leader_elector.worker_id,
+        "is_leader": leader_elector.is_leader,
+        "leader": leader
+    }
+
+@router.get("/telegram/broadcasts", dependencies=[Depends(require_admin)])
+async def list_broadcasts():
+    """列出广播任务及进度（含广播内容与发起人 chat_id，需要 X-Admin-Token）"""
+    if not telegram_service.broadcasts:
+        return []
+    # 任务可能由其它 worker 执行，先同步落盘状态
+    telegram_service.broadcasts.load_states()
+    return telegram_service.broadcasts.list_jobs()
+
+@router.get("/telegram/broadcasts/{job_id}", dependencies=[Depends(require_admin)])
+async def get_broadcast(job_id: str):
+    """查询单个广播任务进度（需要 X-Admin-Token）"""
+    job = None
+    if telegram_service.broadcasts:
+        telegram_service.broadcasts.load_states()
+        job = telegram_service.broadcasts.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Broadcast job not found")
+    return job.to_dict()
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import os
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator, Awaitable, Callable
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from .database import _conn_kwargs
+from .db_guard import DatabaseGuard
+from .metrics import DB_QUERY_ERRORS, DB_QUERY_ROWS, timed_query
+from .query_log import slow_query_log, EXPLAIN_PREFIX
+
+logger = logging.getLogger(__name__)
+
+
+# 每个 worker 在连接池之外的专用连接：快照缓存 LISTEN、leader 选举的 advisory lock
+DEDICATED_CONNECTIONS = 2
+
+
+def _pool_max_size() -> int:
+    """每个 worker 的异步连接池上限
+
+    ASYNC_DB_POOL_MAX_SIZE（未设置时为 DB_POOL_MAX_SIZE）是期望值，
+    不超过连接预算平分到每个 worker 的份额：
+    (DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS) / WEB_CONCURRENCY - DEDICATED_CONNECTIONS。
+    WEB_CONCURRENCY 同时是 uvicorn 默认的 worker 数，多开 worker 时连接池自动变小。
+    """
+    wanted = int(os.getenv("ASYNC_DB_POOL_MAX_SIZE") or os.getenv("DB_POOL_MAX_SIZE", "20"))
+    budget = int(os.getenv("DB_MAX_CONNECTIONS", "100")) - int(os.getenv("DB_RESERVED_CONNECTIONS", "10"))
+    workers = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+    share = max(budget // workers - DEDICATED_CONNECTIONS, int(os.getenv("DB_POOL_MIN_SIZE", "2")), 1)
+    if wanted > share:
+        logger.warning(
+            f"连接池上限 {wanted} 超出每个 worker 的连接预算，按 {share} 创建"
+            f"（{workers} 个 worker，共 {budget} 个连接）"
+        )
+        return share
+    return wanted
+
+
+async def _configure(connection) -> None:
+    """新建连接的初始化：使用自动提交"""
+    await connection.set_autocommit(True)
+
+
+class AsyncDatabase:
+    """后端数据库访问，基于 psycopg 3 的异步连接池
+
+    提供 fetch_all / fetch_one / fetch_rows / stream / execute，
+    供 async def 路由直接 await，不占用线程池。
+    断开的连接由连接池在后台按指数退避重建；连续失败时熔断器快速失败，
+    避免每个请求都等待完整的连接池超时。
+    """
+
+    def __init__(self):
+        self.pool = AsyncConnectionPool(
+            kwargs=_conn_kwargs(),
+            min_size=int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            max_size=_pool_max_size(),
+            timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+            max_idle=float(os.getenv("DB_POOL_MAX_IDLE", "600")),
+            configure=_configure,
+            check=AsyncConnectionPool.check_connection,
+            open=False,
+        )
+        self.guard = DatabaseGuard("async", pool_errors=self._pool_errors)
+        self.breaker = self.guard.breaker
+        self._explain_tasks = set()
+        # 连接池所在的事件循环，同步接口 Database 把调用提交到这里
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def connect(self, wait: bool = True):
+        """打开异步连接池；wait=False 时立即返回，连接在后台建立"""
+        self.loop = asyncio.get_running_loop()
+        try:
+            await self.pool.open(wait=wait)
+        except Exception as e:
+            logger.error(f"异步数据库连接失败: {e}")
+            raise
+
+    async def disconnect(self):
+        """关闭异步连接池"""
+        await self.pool.close()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """返回连接池统计信息"""
+        return self.pool.get_stats()
+
+    def _check_slow(self, query: str, params, timer) -> None:
+        """慢查询记录；抽中时在后台任务中补充 EXPLAIN (ANALYZE, BUFFERS)"""
+        if not slow_query_log.is_slow(timer.duration):
+            return
+        key = slow_query_log.record(timer.name, query, params, timer.duration, timer.rows)
+        if key is not None:
+            task = asyncio.create_task(self._explain(key, query, params))
+            self._explain_tasks.add(task)
+            task.add_done_callback(self._explain_tasks.discard)
+
+    async def _explain(self, key: str, query: str, params) -> None:
+        try:
+            async with self.pool.connection() as connection:
+                cursor = await connection.execute(EXPLAIN_PREFIX + query, params)
+                plan = "\n".join(row[0] for row in await cursor.fetchall())
+            slow_query_log.attach_explain(key, plan)
+        except Exception as e:
+            logger.warning(f"慢查询 EXPLAIN 失败: {e}")
+
+    def _pool_errors(self) -> int:
+        """连接池累计的新建连接失败与借出前检查失败次数"""
+        stats = self.pool.get_stats()
+        return stats.get("connections_errors", 0) + stats.get("connections_lost", 0)
+
+    async def _call(self, run: Callable[[], Awaitable[Any]], retries: int = 0) -> Any:
+        """经熔断器执行 run；retries > 0（仅幂等读）时连接级错误换一条新连接重试（见 DatabaseGuard）
+
+        出错的连接归还时被连接池丢弃，借出时的 check 保证重试拿到的是可用连接。
+        """
+        self.guard.before_call()
+        attempt = 0
+        while True:
+            try:
+                result = await run()
+            except Exception as e:
+                delay = self.guard.retry_delay(e, attempt, retries)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.guard.record_success()
+            return result
+
+    async def fetch_all(self, query: str, params=None, name: str = "other") -> List[Dict[str, Any]]:
+        """执行查询并返回所有结果，name 用于指标中区分查询"""
+        async def run():
+            async with self.pool.connection() as connection:
+                async with connection.cursor(row_factory=dict_row) as cursor:
+                    with timed_query(name, "async") as timer:
+                        await cursor.execute(query, params)
+                        rows = await cursor.fetchall()
+                        timer.rows = len(rows)
+            self._check_slow(query, params, timer)
+            return rows
+
+        try:
+            return await self._call(run, self.guard.read_retries)
+        except Exception as e:
+            logger.error(f"查询失败: {e}")
+            raise
+
+    async def fetch_rows(self, query: str, params=None, name: str = "other") -> List[Tuple]:
+        """执行查询并返回元组行（不构造 dict），用于热点路径按位置解包"""
+        async def run():
+            async with self.pool.connection() as connection:
+                async with connection.cursor() as cursor:
+                    with timed_query(name, "async") as timer:
+                        await cursor.execute(query, params)
+                        rows = await cursor.fetchall()
+                        timer.rows = len(rows)
+            self._check_slow(query, params, timer)
+            return rows
+
+        try:
+            return await self._call(run, self.guard.read_retries)
+        except Exception as e:
+            logger.error(f"查询失败: {e}")
+            raise
+
+    async def fetch_one(self, query: str, params=None, name: str = "other") -> Optional[Dict[str, Any]]:
+        """执行查询并返回单个结果，name 用于指标中区分查询"""
+        async def run():
+            async with self.pool.connection() as connection:
+                async with connection.cursor(row_factory=dict_row) as cursor:
+                    with timed_query(name, "async") as timer:
+                        await cursor.execute(query, params)
+                        row = await cursor.fetchone()
+                        timer.rows = 1 if row else 0
+            self._check_slow(query, params, timer)
+            return row
+
+        try:
+            return await self._call(run, self.guard.read_retries)
+        except Exception as e:
+            logger.error(f"查询失败: {e}")
+            raise
+
+    async def stream(self, query: str, params=None, name: str = "other", batch_size: int = 2000) -> AsyncIterator[List[Tuple]]:
+        """服务端命名游标分批产出元组行，内存占用与结果集大小无关
+
+        整个迭代期间占用一条池连接；迭代中断（例如客户端断开）时游标和事务随之关闭。
+        导出类查询本身就慢，不计入慢查询日志。
+        延迟指标只计 execute：之后的耗时取决于调用方消费的速度；
+        迭代中断（GeneratorExit / 取消）不计为查询错误。
+        与其它查询一样经过熔断器，但不重试：已经产出的批次无法撤回。
+        """
+        self.guard.before_call()
+        try:
+            async with self.pool.connection() as connection:
+                async with connection.transaction():
+                    async with connection.cursor(name=f"stream_{name}") as cursor:
+                        cursor.itersize = batch_size
+                        with timed_query(name, "async"):
+                            await cursor.execute(query, params)
+                        self.guard.record_success()
+                        total = 0
+                        try:
+                            while True:
+                                rows = await cursor.fetchmany(batch_size)
+                                if not rows:
+                                    break
+                                total += len(rows)
+                                yield rows
+                        except Exception:
+                            DB_QUERY_ERRORS.labels(name, "async").inc()
+                            raise
+                        DB_QUERY_ROWS.labels(name, "async").observe(total)
+        except Exception as e:
+            self.guard.retry_delay(e, 0)
+            raise
+
+    async def execute(self, query: str, params=None, name: str = "other") -> str:
+        """执行非查询语句，name 用于指标中区分查询；写操作不自动重试"""
+        async def run():
+            async with self.pool.connection() as connection:
+                async with connection.cursor() as cursor:
+                    with timed_query(name, "async") as timer:
+                        await cursor.execute(query, params)
+                        timer.rows = max(cursor.rowcount, 0)
+                        status = cursor.statusmessage
+            self._check_slow(query, params, timer)
+            return status
+
+        try:
+            return await self._call(run)
+        except Exception as e:
+            logger.error(f"执行失败: {e}")
+            raise
+
+# 全局异步数据库实例
+async_database = AsyncDatabase()
+
+# 异步数据库连接依赖
+async def get_async_database():
+    return async_database
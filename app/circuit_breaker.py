@@ -0,0 +1,99 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开期间快速失败，不再访问数据库"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} database circuit is open, retry after {retry_after:.2f} sec")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """数据库熔断器（线程安全）
+
+    - closed：正常放行；连续 failure_threshold 次连接级失败后打开
+    - open：reset_timeout 秒内的调用立即抛出 CircuitOpenError，不再等待连接超时
+    - half_open：到期后只放行一次探测调用，成功则关闭；失败则重新打开，
+      等待时间翻倍直到 max_reset_timeout（指数退避重连）
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 1.0, max_reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+
+        self._state = CLOSED
+        self._failures = 0
+        self._open_timeout = reset_timeout
+        self._opened_at = 0.0
+        # 探测调用被取消时不会回报结果，超过该时间后允许新的探测
+        self._probe_deadline: Optional[float] = None
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def before_call(self) -> None:
+        """调用数据库前检查；熔断中抛出 CircuitOpenError"""
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            now = time.monotonic()
+            if self._state == OPEN:
+                remaining = self._opened_at + self._open_timeout - now
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self._state = HALF_OPEN
+            elif self._probe_deadline is not None and now < self._probe_deadline:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self._probe_deadline - now)
+            self._probe_deadline = now + self._open_timeout
+
+    def record_success(self) -> None:
+        """数据库有响应（包括 SQL 错误）即视为成功"""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._open_timeout = self.reset_timeout
+            self._probe_deadline = None
+
+    def record_failure(self) -> None:
+        """连接级失败（连接断开、连接池超时等）"""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._open_timeout = min(self._open_timeout * 2, self.max_reset_timeout)
+            else:
+                self._failures += 1
+                if self._state == OPEN or self._failures < self.failure_threshold:
+                    return
+            self._state = OPEN
+            self._opened_at = now
+            self._probe_deadline = None
+            self.opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._state,
+                "open": self._state != CLOSED,
+                "failures": self._failures,
+                "open_timeout": self._open_timeout,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
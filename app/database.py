@@ -1,77 +1,80 @@
+import asyncio
 import os
-import psycopg2
-import psycopg2.extras
 from typing import Optional, List, Dict, Any
-from dotenv import load_dotenv
 
-# 加载环境变量
-load_dotenv()
+
+def _conn_kwargs() -> Dict[str, Any]:
+    """后端数据库连接参数（AsyncDatabase 连接池、LISTEN、leader 选举、迁移共用）"""
+    return {
+        "host": os.getenv("POSTGRES_HOST"),
+        "port": os.getenv("POSTGRES_PORT", "5432"),
+        "dbname": os.getenv("POSTGRES_DB"),
+        "user": os.getenv("POSTGRES_USER"),
+        "password": os.getenv("POSTGRES_PASSWORD"),
+        # 数据库不可达时新建连接最多等待的秒数
+        "connect_timeout": os.getenv("DB_CONNECT_TIMEOUT", "5"),
+    }
+
 
 class Database:
-    def __init__(self):
-        self.connection: Optional[psycopg2.extensions.connection] = None
-        
+    """同步数据库接口，fetch_all / fetch_one / execute 签名不变，内部委托给 AsyncDatabase
+
+    连接池、熔断重试和慢查询日志都由 AsyncDatabase 负责；同步调用方（线程池中的同步路由、
+    后台线程）的调用提交到连接池所在的事件循环执行并等待结果。
+    不能在该事件循环的线程中调用（会阻塞事件循环），async 代码应直接使用 async_database。
+    """
+
+    def __init__(self, async_db=None):
+        self._async_db = async_db
+
+    @property
+    def async_db(self):
+        if self._async_db is None:
+            # async_database 导入本模块的 _conn_kwargs，这里延迟导入
+            from .async_database import async_database
+            self._async_db = async_database
+        return self._async_db
+
+    def _run(self, coro):
+        loop = self.async_db.loop
+        if loop is None or loop.is_closed():
+            coro.close()
+            raise RuntimeError("AsyncDatabase 尚未连接")
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()
+            raise RuntimeError("不能在事件循环线程中调用 Database 的同步方法，请使用 async_database")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
     def connect(self):
-        """创建数据库连接"""
-        if self.connection is None or self.connection.closed:
-            try:
-                # 使用后端数据库配置
-                self.connection = psycopg2.connect(
-                    host=os.getenv("POSTGRES_HOST"),
-                    port=os.getenv("POSTGRES_PORT", "5432"),
-                    database=os.getenv("POSTGRES_DB"),
-                    user=os.getenv("POSTGRES_USER"),
-                    password=os.getenv("POSTGRES_PASSWORD")
-                )
-                self.connection.autocommit = True
-            except Exception as e:
-                print(f"Database connection error: {e}")
-                raise
-    
+        """连接池随应用启动由 AsyncDatabase.connect 打开，这里确认连接可用"""
+        self.fetch_one("SELECT 1", name="connect")
+
     def disconnect(self):
-        """关闭数据库连接"""
-        if self.connection and not self.connection.closed:
-            self.connection.close()
-            self.connection = None
-    
-    def fetch_all(self, query: str, params=None) -> List[Dict[str, Any]]:
-        """执行查询并返回所有结果"""
-        self.connect()
-        try:
-            with self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-                cursor.execute(query, params)
-                rows = cursor.fetchall()
-                return [dict(row) for row in rows]
-        except Exception as e:
-            print(f"Query error: {e}")
-            raise
-    
-    def fetch_one(self, query: str, params=None) -> Optional[Dict[str, Any]]:
-        """执行查询并返回单个结果"""
-        self.connect()
-        try:
-            with self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-                cursor.execute(query, params)
-                row = cursor.fetchone()
-                return dict(row) if row else None
-        except Exception as e:
-            print(f"Query error: {e}")
-            raise
-    
-    def execute(self, query: str, params=None) -> str:
-        """执行非查询语句"""
-        self.connect()
-        try:
-            with self.connection.cursor() as cursor:
-                cursor.execute(query, params)
-                return cursor.statusmessage
-        except Exception as e:
-            print(f"Execute error: {e}")
-            raise
+        """连接池随应用关闭，这里不做处理"""
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """返回连接池统计信息"""
+        return self.async_db.pool_stats()
+
+    def fetch_all(self, query: str, params=None, name: str = "other") -> List[Dict[str, Any]]:
+        """执行查询并返回所有结果，name 用于指标中区分查询"""
+        return self._run(self.async_db.fetch_all(query, params, name=name))
+
+    def fetch_one(self, query: str, params=None, name: str = "other") -> Optional[Dict[str, Any]]:
+        """执行查询并返回单个结果，name 用于指标中区分查询"""
+        return self._run(self.async_db.fetch_one(query, params, name=name))
+
+    def execute(self, query: str, params=None, name: str = "other") -> str:
+        """执行非查询语句，name 用于指标中区分查询；写操作不自动重试"""
+        return self._run(self.async_db.execute(query, params, name=name))
 
 # 全局数据库实例
 database = Database()
 
 # 数据库连接依赖
 def get_database():
-    return database
\ No newline at end of file
+    return database
@@ -0,0 +1,79 @@
+"""AsyncDatabase 的错误分类、熔断与幂等读重试"""
+import logging
+import os
+from typing import Callable, Optional
+import psycopg
+from psycopg_pool import PoolClosed, PoolTimeout
+from .circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+
+def is_connection_error(e: Exception) -> bool:
+    """连接级错误：连接断开、连接池超时等；语句超时说明数据库有响应，不在此列"""
+    return (
+        isinstance(e, (psycopg.OperationalError, psycopg.InterfaceError))
+        and not isinstance(e, psycopg.errors.QueryCanceled)
+    )
+
+
+def breaker_from_env(name: str) -> CircuitBreaker:
+    """按环境变量配置的数据库熔断器"""
+    return CircuitBreaker(
+        name,
+        failure_threshold=int(os.getenv("DB_BREAKER_FAILURE_THRESHOLD", "5")),
+        reset_timeout=float(os.getenv("DB_BREAKER_RESET_TIMEOUT", "1")),
+        max_reset_timeout=float(os.getenv("DB_BREAKER_MAX_RESET_TIMEOUT", "30")),
+    )
+
+
+class DatabaseGuard:
+    """熔断器与幂等读重试策略
+
+    - 连接池饱和或已关闭：数据库本身没有问题，既不重试也不计入熔断
+    - 其它非连接级错误（SQL 错误、语句超时）：数据库有响应，计为成功
+    - 连接级错误：retries 次以内换新连接重试（连接池超时不重试），用完后计为失败
+
+    pool_errors 返回连接池累计的新建连接失败 / 连接丢失次数（psycopg_pool 的统计）。
+    连接池超时时，上次数据库有响应以来该值增加过说明数据库不可达，否则只是连接全部被占用；
+    只读不改基准值，故障期间并发的超时都计为连接级失败。
+    """
+
+    def __init__(self, name: str, pool_errors: Optional[Callable[[], int]] = None):
+        self.breaker = breaker_from_env(name)
+        self.pool_errors = pool_errors
+        # 幂等读遇到连接级错误时换新连接重试的次数与退避基数（秒）
+        self.read_retries = int(os.getenv("DB_READ_RETRIES", "1"))
+        self.retry_backoff = float(os.getenv("DB_RETRY_BACKOFF", "0.05"))
+        self._pool_errors_at_success = 0
+
+    def before_call(self) -> None:
+        self.breaker.before_call()
+
+    def record_success(self) -> None:
+        if self.pool_errors is not None:
+            self._pool_errors_at_success = self.pool_errors()
+        self.breaker.record_success()
+
+    def is_saturated(self, e: Exception) -> bool:
+        """连接池已关闭（停机中）或连接全部被占用"""
+        if isinstance(e, PoolClosed):
+            return True
+        return (
+            isinstance(e, PoolTimeout)
+            and self.pool_errors is not None
+            and self.pool_errors() <= self._pool_errors_at_success
+        )
+
+    def retry_delay(self, e: Exception, attempt: int, retries: int = 0) -> Optional[float]:
+        """按错误类型更新熔断器；返回换新连接重试前等待的秒数，None 表示不重试"""
+        if self.is_saturated(e):
+            return None
+        if not is_connection_error(e):
+            self.record_success()
+            return None
+        if attempt >= retries or isinstance(e, PoolTimeout):
+            self.breaker.record_failure()
+            return None
+        logger.warning(f"连接级错误，换新连接重试: {e}")
+        return self.retry_backoff * 2 ** attempt
@@ -0,0 +1,90 @@
+import gzip
+import hashlib
+from decimal import Decimal
+from typing import Any, Optional
+import orjson
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，缺失时只提供 gzip
+    brotli = None
+
+
+def _default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+
+class EncodedPayload:
+    """预先序列化的响应体：JSON 只编码一次，gzip/brotli 版本首次需要时压缩一次并缓存"""
+    __slots__ = ("body", "digest", "_gzip", "_br")
+
+    def __init__(self, data: Any):
+        self.body = orjson.dumps(data, default=_default)
+        self.digest = hashlib.blake2b(self.body, digest_size=16).hexdigest()
+        self._gzip: Optional[bytes] = None
+        self._br: Optional[bytes] = None
+
+    @property
+    def gzip(self) -> bytes:
+        if self._gzip is None:
+            self._gzip = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzip
+
+    @property
+    def br(self) -> bytes:
+        if self._br is None:
+            self._br = brotli.compress(self.body, quality=5)
+        return self._br
+
+
+def _etag_matches(if_none_match: str, digest: str) -> bool:
+    """If-None-Match 使用弱比较：忽略 W/ 前缀；同一快照的任一编码版本都视为未修改"""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.removeprefix("W/").strip('"').split("-", 1)[0] == digest:
+            return True
+    return False
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() == coding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def encoded_response(request: Request, payload: EncodedPayload) -> Response:
+    """返回预编码的响应，支持 If-None-Match → 304 与 br/gzip 内容协商"""
+    accept_encoding = request.headers.get("accept-encoding", "")
+    if brotli is not None and _accepts(accept_encoding, "br"):
+        coding = "br"
+    elif _accepts(accept_encoding, "gzip"):
+        coding = "gzip"
+    else:
+        coding = None
+
+    # 强 ETag 按编码区分（RFC 9110：不同表示需要不同的强校验值）
+    headers = {
+        "ETag": f'"{payload.digest}-{coding}"' if coding else f'"{payload.digest}"',
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, payload.digest):
+        return Response(status_code=304, headers=headers)
+
+    if coding == "br":
+        body = payload.br
+    elif coding == "gzip":
+        body = payload.gzip
+    else:
+        body = payload.body
+    if coding:
+        headers["Content-Encoding"] = coding
+    return Response(content=body, media_type="application/json", headers=headers)
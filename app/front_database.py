@@ -0,0 +1,132 @@
+import asyncio
+import os
+from typing import AsyncIterator, Optional, Tuple
+from psycopg import sql
+from psycopg_pool import AsyncConnectionPool
+
+# 能转为 bigint 的 chat_id（私聊为正数、群组为负数）；NULL 也不匹配
+NUMERIC_CHAT_ID = r"^-?[0-9]{1,18}$"
+
+
+class FrontDatabase:
+    """前端用户库（FRONT_DATABASE_URL）的异步连接池客户端
+
+    只读访问 telegram_binding，按 chat_id 升序分批读取，
+    内存占用与用户总数无关。
+
+    非数字的 chat_id 在转为 bigint 之前被过滤掉（跳过该用户），不会让整批查询失败。
+
+    keyset 分批依赖 chat_id 上的索引：telegram_chat_id 为 bigint 时普通索引即可；
+    为文本列时需要与查询条件一致的表达式部分索引，否则每批都是一次全表扫描加排序：
+        CREATE INDEX CONCURRENTLY telegram_binding_chat_id_bigint_idx
+        ON telegram_binding ((telegram_chat_id::bigint)) WHERE telegram_chat_id::text ~ '^-?[0-9]{1,18}$';
+    """
+
+    def __init__(self, url: Optional[str] = None, max_size: int = 4, batch_size: int = 1000, locale_column: Optional[str] = None):
+        self.url = url
+        self.batch_size = batch_size
+        # telegram_binding 中保存用户语言的列，未设置时不区分语言
+        self.locale_column = locale_column or None
+        self.pool: Optional[AsyncConnectionPool] = None
+        if url:
+            self.pool = AsyncConnectionPool(
+                url,
+                min_size=0,
+                max_size=max_size,
+                kwargs={"autocommit": True},
+                open=False,
+            )
+        self._open_lock = asyncio.Lock()
+        self._opened = False
+
+    @property
+    def configured(self) -> bool:
+        return self.pool is not None
+
+    async def _ensure_open(self) -> AsyncConnectionPool:
+        if self.pool is None:
+            raise RuntimeError("FRONT_DATABASE_URL 环境变量未设置")
+        if not self._opened:
+            async with self._open_lock:
+                if not self._opened:
+                    await self.pool.open()
+                    self._opened = True
+        return self.pool
+
+    async def disconnect(self):
+        """关闭连接池"""
+        if self.pool is not None and self._opened:
+            await self.pool.close()
+            self._opened = False
+
+    @staticmethod
+    def _keyset(select: sql.Composable, last: Optional[int], batch_size: int) -> Tuple[sql.Composed, tuple]:
+        """一批 keyset 查询；第一批不带游标条件，之后直接比较 chat_id 表达式，
+        不使用 (%s IS NULL OR ...) 这种无法走索引的写法"""
+        if last is None:
+            where, params = sql.SQL(""), (batch_size,)
+        else:
+            where, params = sql.SQL("AND telegram_chat_id::bigint > %s"), (last, batch_size)
+        query = sql.SQL(
+            """
+            {select}
+            FROM telegram_binding
+            WHERE telegram_chat_id::text ~ {numeric}
+            {where}
+            ORDER BY telegram_chat_id::bigint
+            LIMIT %s
+            """
+        ).format(select=select, where=where, numeric=sql.Literal(NUMERIC_CHAT_ID))
+        return query, params
+
+    async def iter_chat_ids(self, after: Optional[int] = None, batch_size: Optional[int] = None) -> AsyncIterator[int]:
+        """按升序分批产出大于 after 的已绑定 chat_id
+
+        每批是一条独立的 keyset 查询（chat_id > 上一批最后一个），
+        不会在整个广播期间占用连接或长事务。
+        """
+        pool = await self._ensure_open()
+        batch_size = batch_size or self.batch_size
+        select = sql.SQL("SELECT DISTINCT telegram_chat_id::bigint")
+        last = after
+        while True:
+            query, params = self._keyset(select, last, batch_size)
+            async with pool.connection() as connection:
+                cursor = await connection.execute(query, params)
+                rows = await cursor.fetchall()
+            for (chat_id,) in rows:
+                yield chat_id
+            if len(rows) < batch_size:
+                return
+            last = rows[-1][0]
+
+    async def iter_chat_locales(self, after: Optional[int] = None, batch_size: Optional[int] = None) -> AsyncIterator[Tuple[int, Optional[str]]]:
+        """与 iter_chat_ids 相同的 keyset 分批，同时产出用户语言（未配置 locale_column 时为 None）"""
+        if self.locale_column is None:
+            async for chat_id in self.iter_chat_ids(after, batch_size):
+                yield chat_id, None
+            return
+        pool = await self._ensure_open()
+        batch_size = batch_size or self.batch_size
+        select = sql.SQL("SELECT DISTINCT ON (telegram_chat_id::bigint) telegram_chat_id::bigint, {locale}").format(
+            locale=sql.Identifier(self.locale_column)
+        )
+        last = after
+        while True:
+            query, params = self._keyset(select, last, batch_size)
+            async with pool.connection() as connection:
+                cursor = await connection.execute(query, params)
+                rows = await cursor.fetchall()
+            for chat_id, locale in rows:
+                yield chat_id, locale
+            if len(rows) < batch_size:
+                return
+            last = rows[-1][0]
+
+# 全局前端数据库实例
+front_database = FrontDatabase(
+    os.getenv("FRONT_DATABASE_URL"),
+    max_size=int(os.getenv("FRONT_DB_POOL_MAX_SIZE", "4")),
+    batch_size=int(os.getenv("FRONT_DB_BATCH_SIZE", "1000")),
+    locale_column=os.getenv("FRONT_LOCALE_COLUMN"),
+)
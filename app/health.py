@@ -0,0 +1,72 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+from .async_database import async_database
+
+
+class ReadinessProbe:
+    """就绪检查：启动迁移与预热（连接池 + 快照缓存）完成后才接收流量
+
+    启动迁移因 SQL 错误失败时 migration_error 记录错误，一直不就绪。
+
+    预热完成后数据库故障不再摘除流量：快照接口在熔断期间返回上次成功的快照，
+    所有实例同时摘除反而整体不可用；数据库状态仍在 details 中返回。
+
+    数据库探测结果缓存 ttl 秒，负载均衡器频繁探测时最多每 ttl 秒访问一次数据库；
+    预热状态是进程内标记，实时读取。关闭时先标记 draining，让流量在停止前切走。
+    """
+
+    def __init__(self, ttl: float = 2.0, timeout: float = 1.0):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.migrations_done = False
+        self.migration_error: Optional[str] = None
+        self.pools_warm = False
+        self.cache_warm = False
+        self.draining = False
+        self.started_at = time.time()
+        self.warm_at: Optional[float] = None
+        self._database_ok: Optional[bool] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def mark_cache_warm(self) -> None:
+        self.cache_warm = True
+        self.warm_at = time.time()
+
+    def _fresh(self) -> bool:
+        return self._database_ok is not None and time.monotonic() - self._checked_at < self.ttl
+
+    async def _check_database(self) -> bool:
+        """数据库探测结果缓存 ttl 秒，并发探测共用同一次查询"""
+        if self._fresh():
+            return self._database_ok
+        async with self._lock:
+            if not self._fresh():
+                try:
+                    await asyncio.wait_for(async_database.fetch_one("SELECT 1", name="readiness"), self.timeout)
+                    self._database_ok = True
+                except Exception:
+                    self._database_ok = False
+                self._checked_at = time.monotonic()
+        return self._database_ok
+
+    async def check(self) -> Tuple[bool, Dict[str, Any]]:
+        if self.draining:
+            return False, {"draining": True}
+        details = {
+            "migrations_done": self.migrations_done,
+            "migration_error": self.migration_error,
+            "pools_warm": self.pools_warm,
+            "cache_warm": self.cache_warm,
+            "database": await self._check_database(),
+            "warmup_seconds": round(self.warm_at - self.started_at, 3) if self.warm_at else None,
+        }
+        return self.migrations_done and self.pools_warm and self.cache_warm, details
+
+# 全局就绪检查实例
+readiness_probe = ReadinessProbe(
+    ttl=float(os.getenv("READINESS_CACHE_TTL", "2")),
+    timeout=float(os.getenv("READINESS_TIMEOUT", "1")),
+)
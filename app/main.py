@@ -1,18 +1,28 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import asyncio
 import logging
 from contextlib import asynccontextmanager
-from dotenv import load_dotenv
-from .database import database
-from .api.ai_recommendations import router as ai_recommendations_router
-from .api.matches import router as matches_router
+from .async_database import async_database
+from .front_database import front_database
+from .api.ai_recommendations import router as ai_recommendations_router, recommendations_payload
+from .api.matches import router as matches_router, matches_payload
 from .api.telegram import router as telegram_router
+from .api.stream import router as stream_router
+from .api.admin import router as admin_router
+from .api.export import router as export_router
+from .api.stats import router as stats_router
 from .services.telegram_service import telegram_service
-
-# 加载环境变量
-load_dotenv()
+from .services.snapshot_cache import snapshot_cache
+from .services.leader import leader_elector
+from .services.stats import stats_refresher
+from .migrate import apply_migrations, check_indexes
+from .health import readiness_probe
+from .db_guard import is_connection_error
+from .metrics import MetricsMiddleware, mark_process_dead, publish_stats, register_stats, render_metrics
+from .profiling import ProfilingMiddleware
 
 # 配置日志
 logging.basicConfig(
@@ -21,24 +31,105 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+WARMUP_LOCALES = [l.strip() for l in os.getenv("WARMUP_LOCALES", "zh,en").split(",") if l.strip()]
+
+async def run_migrations():
+    """执行数据库迁移（可选），完成前 /health/ready 不返回就绪；之后启动依赖新表的后台任务并检查索引
+
+    只有连接级错误（数据库暂不可达）5 秒后重试；SQL 错误重试也不会成功，
+    记录到 /health/ready 的 migration_error 并保持未就绪，让部署明确失败。
+    """
+    if os.getenv("MIGRATE_ON_STARTUP", "false").lower() == "true":
+        while True:
+            try:
+                await asyncio.to_thread(apply_migrations)
+                break
+            except Exception as e:
+                if not is_connection_error(e):
+                    logger.error(f"数据库迁移失败，需要人工处理: {e}")
+                    readiness_probe.migration_error = f"{type(e).__name__}: {e}"
+                    return
+                logger.warning(f"数据库迁移连接失败，5秒后重试: {e}")
+                await asyncio.sleep(5)
+    readiness_probe.migrations_done = True
+
+    # 命中率统计的后台增量刷新（依赖迁移 0004 创建的表）
+    stats_refresher.start(async_database)
+
+    try:
+        await asyncio.to_thread(check_indexes)
+    except Exception as e:
+        logger.warning(f"索引检查失败: {e}")
+
+async def warm_pools_and_cache():
+    """预热连接池并预加载热点快照，完成后 /health/ready 才返回就绪；数据库不可用时持续重试"""
+    while True:
+        try:
+            # pool.wait() 超时会关闭连接池，这里用一次查询确认异步池已有可用连接
+            await async_database.fetch_one("SELECT 1", name="warmup")
+            readiness_probe.pools_warm = True
+            await asyncio.gather(
+                matches_payload(async_database),
+                *(recommendations_payload(async_database, locale) for locale in WARMUP_LOCALES),
+            )
+            readiness_probe.mark_cache_warm()
+            logger.info(f"预热完成，用时 {readiness_probe.warm_at - readiness_probe.started_at:.2f}s")
+            return
+        except Exception as e:
+            logger.warning(f"连接池/缓存预热失败，5秒后重试: {e}")
+            await asyncio.sleep(5)
+
+async def start_bot():
+    """初始化并启动 bot，再参与选主：只有 leader 负责轮询/注册 webhook 和广播任务"""
+    logger.info("正在初始化 Telegram bot...")
+    if not await telegram_service.initialize():
+        logger.warning("Telegram bot 未启动")
+        return
+    leader_elector.on_elected = telegram_service.become_leader
+    leader_elector.on_demoted = telegram_service.resign_leader
+    await telegram_service.start()
+    await leader_elector.start()
+    logger.info("Telegram bot 启动成功")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 启动时初始化 Telegram bot
-    logger.info("正在初始化 Telegram bot...")
-    if await telegram_service.initialize():
-        # 在后台任务中启动 bot 轮询
-        asyncio.create_task(telegram_service.start_polling())
-        logger.info("Telegram bot 启动成功")
-    else:
-        logger.warning("Telegram bot 初始化失败")
+    # 异步连接池立即打开（连接在后台建立），请求不会因连接池未打开而失败
+    try:
+        await async_database.connect(wait=False)
+    except Exception as e:
+        logger.warning(f"打开异步连接池失败: {e}")
+
+    # 启动快照缓存的 ai_eval 变更监听（触发器由迁移 0003 安装）
+    snapshot_cache.start()
+
+    # 多进程指标发布、迁移、预热和 bot 启动都在后台进行，不阻塞开始服务；就绪状态见 /health/ready
+    startup_tasks = [
+        asyncio.create_task(publish_stats(float(os.getenv("METRICS_PUBLISH_INTERVAL", "5")))),
+        asyncio.create_task(run_migrations()),
+        asyncio.create_task(warm_pools_and_cache()),
+        asyncio.create_task(start_bot()),
+    ]
     
     yield
     
+    # 先标记不再就绪，让负载均衡器停止转发
+    readiness_probe.draining = True
+    for task in startup_tasks:
+        task.cancel()
+    await asyncio.gather(*startup_tasks, return_exceptions=True)
+
     # 关闭时停止 Telegram bot
     logger.info("正在停止 Telegram bot...")
-    await telegram_service.stop_polling()
+    await leader_elector.stop()
+    await telegram_service.stop()
     logger.info("Telegram bot 已停止")
 
+    await stats_refresher.stop()
+    await snapshot_cache.stop()
+    await front_database.disconnect()
+    await async_database.disconnect()
+    mark_process_dead()
+
 # 创建FastAPI应用实例
 app = FastAPI(
     title="My App API",
@@ -55,12 +146,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+# 按需采集单个请求的 cProfile（管理员请求头 X-Profile 或 PROFILE_SAMPLE_RATE 抽样）
+app.add_middleware(ProfilingMiddleware)
+
+# 请求延迟指标
+app.add_middleware(MetricsMiddleware)
+
+# 抓取时读取的连接池 / 缓存统计
+register_stats("async_db_pool", "Async database pool", async_database.pool_stats)
+register_stats("async_db_breaker", "Async database circuit breaker", async_database.breaker.stats)
+register_stats("snapshot_cache", "Snapshot cache", snapshot_cache.stats)
+register_stats("stats_refresher", "Accuracy stats refresher", stats_refresher.stats)
+register_stats("notifications", "Binding-success notification queue", telegram_service.notifications.stats)
+
 # 注册API路由
 app.include_router(ai_recommendations_router, prefix="/api", tags=["AI Recommendations"])
 app.include_router(matches_router, prefix="/api", tags=["Matches"])
 app.include_router(telegram_router, prefix="/api", tags=["Telegram"])
+app.include_router(stream_router, prefix="/api", tags=["Stream"])
+app.include_router(admin_router, prefix="/api", tags=["Admin"])
+app.include_router(export_router, prefix="/api", tags=["Export"])
+app.include_router(stats_router, prefix="/api", tags=["Stats"])
 
 # 根路径
 @app.get("/")
@@ -72,11 +181,46 @@ async def root():
 async def hello_world():
     return {"message": "hello world"}
 
-# 健康检查端点
+# 健康检查端点（存活检查，保留旧路径）
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "message": "API is working properly"}
 
+# 存活检查：进程和事件循环正常即返回，不检查依赖
+@app.get("/health/live")
+async def liveness():
+    return {"status": "alive"}
+
+# 就绪检查：连接池与快照缓存已预热且数据库可用，结果缓存 READINESS_CACHE_TTL 秒
+@app.get("/health/ready")
+async def readiness():
+    ready, details = await readiness_probe.check()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", **details},
+    )
+
+# 数据库连接池统计
+@app.get("/health/db-pool")
+async def db_pool_stats():
+    return {
+        "async": async_database.pool_stats(),
+        "breakers": {
+            "async": async_database.breaker.stats(),
+        },
+    }
+
+# 快照缓存统计
+@app.get("/health/cache")
+async def cache_stats():
+    return snapshot_cache.stats()
+
+# Prometheus 指标
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,201 @@
+import asyncio
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+# 延迟分桶（秒）：覆盖缓存命中的亚毫秒级到慢查询的数秒级
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Database query latency by named query",
+    ["query", "backend"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_ROWS = Histogram(
+    "db_query_rows",
+    "Rows returned by named query",
+    ["query", "backend"],
+    buckets=ROW_BUCKETS,
+)
+DB_QUERY_ERRORS = Counter(
+    "db_query_errors_total",
+    "Database query errors by named query",
+    ["query", "backend"],
+)
+
+TELEGRAM_SEND_LATENCY = Histogram(
+    "telegram_send_duration_seconds",
+    "Telegram send_message latency (single API call)",
+    buckets=LATENCY_BUCKETS,
+)
+TELEGRAM_SEND_TOTAL = Counter(
+    "telegram_send_total",
+    "Telegram send_message attempts by result",
+    ["result"],
+)
+BROADCAST_MESSAGES = Counter(
+    "broadcast_messages_total",
+    "Broadcast messages processed by result; rate() gives broadcast throughput",
+    ["result"],
+)
+NOTIFICATION_DELIVERIES = Counter(
+    "notification_deliveries_total",
+    "Queued notification deliveries by result (sent, failed, duplicate, rejected)",
+    ["result"],
+)
+
+
+# 多 worker 部署（uvicorn --workers）时所有进程把指标写入该目录，由被抓取的 worker 汇总
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+
+class _StatsCollector(Collector):
+    """读取连接池、缓存等运行时统计，转为 gauge
+
+    单进程时在抓取时读取；多进程时这些统计是每个 worker 各自的，
+    由 publish 定期写入 multiprocess_mode="liveall" 的 Gauge（按 pid 标签区分，进程退出后清除）。
+    """
+
+    def __init__(self):
+        self._sources: List[Tuple[str, str, Callable[[], Dict]]] = []
+        self._gauges: Dict[str, Gauge] = {}
+
+    def add_source(self, prefix: str, documentation: str, stats: Callable[[], Dict]) -> None:
+        self._sources.append((prefix, documentation, stats))
+
+    def _values(self) -> Iterable[Tuple[str, str, float]]:
+        for prefix, documentation, stats in self._sources:
+            try:
+                values = stats()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if isinstance(value, (int, float)):
+                    yield f"{prefix}_{key}", f"{documentation}: {key}", value
+
+    def collect(self) -> Iterable[GaugeMetricFamily]:
+        if MULTIPROC_DIR:
+            return
+        for name, documentation, value in self._values():
+            yield GaugeMetricFamily(name, documentation, value=value)
+
+    def publish(self) -> None:
+        """多进程模式：把本 worker 的统计写入共享目录"""
+        for name, documentation, value in self._values():
+            gauge = self._gauges.get(name)
+            if gauge is None:
+                gauge = self._gauges[name] = Gauge(name, documentation, multiprocess_mode="liveall", registry=None)
+            gauge.set(value)
+
+
+stats_collector = _StatsCollector()
+REGISTRY.register(stats_collector)
+
+
+def register_stats(prefix: str, documentation: str, stats: Callable[[], Dict]) -> None:
+    """注册一个在抓取时读取的统计来源（例如 async_database.pool_stats）"""
+    stats_collector.add_source(prefix, documentation, stats)
+
+
+async def publish_stats(interval: float = 5.0) -> None:
+    """多进程模式下定期发布本 worker 的运行时统计；单进程模式下直接返回"""
+    if not MULTIPROC_DIR:
+        return
+    while True:
+        stats_collector.publish()
+        await asyncio.sleep(interval)
+
+
+def mark_process_dead() -> None:
+    """worker 退出时清除其 liveall gauge，避免残留已退出进程的统计"""
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class timed_query:
+    """记录一次数据库查询的耗时、行数和错误"""
+    __slots__ = ("name", "backend", "start", "rows", "duration")
+
+    def __init__(self, name: str, backend: str):
+        self.name = name
+        self.backend = backend
+        self.rows = None
+        self.duration = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        DB_QUERY_LATENCY.labels(self.name, self.backend).observe(self.duration)
+        if exc_type is not None:
+            DB_QUERY_ERRORS.labels(self.name, self.backend).inc()
+        elif self.rows is not None:
+            DB_QUERY_ROWS.labels(self.name, self.backend).observe(self.rows)
+        return False
+
+
+class MetricsMiddleware:
+    """纯 ASGI 中间件，按路由模板记录请求延迟（不使用 BaseHTTPMiddleware，开销更低且不影响流式响应）"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_LATENCY.labels(scope["method"], path, str(status)).observe(time.perf_counter() - start)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """生成 Prometheus 文本格式；设置 PROMETHEUS_MULTIPROC_DIR 时汇总所有 worker"""
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        # 被抓取的 worker 先刷新自己的统计，其它 worker 的统计最多延迟一个发布周期
+        stats_collector.publish()
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
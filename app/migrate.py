@@ -0,0 +1,152 @@
+"""数据库迁移
+
+app/migrations 下按版本号排序的 .sql 文件，已执行的版本记录在 schema_migrations 表。
+文件首行为 `-- migrate:no-transaction` 时在事务外执行（CREATE INDEX CONCURRENTLY 需要），
+此类文件只能包含一条语句。
+
+用法：
+    python -m app.migrate            # 执行未应用的迁移
+    python -m app.migrate status     # 查看迁移与索引状态
+"""
+import logging
+import os
+import sys
+from typing import Dict, List, Tuple
+import psycopg
+from .database import _conn_kwargs
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+NO_TRANSACTION_MARKER = "-- migrate:no-transaction"
+# 多个 worker 同时启动时只允许一个执行迁移
+MIGRATION_LOCK_KEY = 7315002
+
+# 热点查询依赖的索引：启动时检查是否存在且有效
+EXPECTED_INDEXES = {
+    "ai_eval_odds_fixture_date_id_idx": "/api/matches 时间窗口扫描与 keyset 分页",
+    "ai_eval_recommended_window_idx": "/api/ai-recommendations top-3",
+    "ai_eval_settled_fixture_date_idx": "命中率统计增量刷新",
+}
+
+
+def load_migrations() -> List[Tuple[str, str]]:
+    """返回 (版本号, SQL) 列表，按版本号排序"""
+    migrations = []
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        if name.endswith(".sql"):
+            with open(os.path.join(MIGRATIONS_DIR, name), encoding="utf-8") as f:
+                migrations.append((name[:-4], f.read()))
+    return migrations
+
+
+def _connect():
+    return psycopg.connect(autocommit=True, **_conn_kwargs())
+
+
+def _applied_versions(cursor) -> set:
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def apply_migrations() -> List[str]:
+    """执行所有未应用的迁移，返回本次执行的版本号"""
+    applied_now = []
+    connection = _connect()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+            try:
+                applied = _applied_versions(cursor)
+                for version, sql in load_migrations():
+                    if version in applied:
+                        continue
+                    logger.info(f"执行迁移 {version}")
+                    if sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+                        cursor.execute(sql)
+                        cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+                    else:
+                        with connection.cursor() as tx_cursor:
+                            tx_cursor.execute("BEGIN")
+                            try:
+                                tx_cursor.execute(sql)
+                                tx_cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+                                tx_cursor.execute("COMMIT")
+                            except Exception:
+                                tx_cursor.execute("ROLLBACK")
+                                raise
+                    applied_now.append(version)
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+    finally:
+        connection.close()
+    return applied_now
+
+
+def index_status() -> Dict[str, str]:
+    """检查 EXPECTED_INDEXES：返回 {索引名: ok / missing / invalid}"""
+    connection = _connect()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT c.relname, i.indisvalid
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE c.relname = ANY(%s)
+                """,
+                (list(EXPECTED_INDEXES),),
+            )
+            found = {name: valid for name, valid in cursor.fetchall()}
+    finally:
+        connection.close()
+    return {
+        name: ("ok" if found[name] else "invalid") if name in found else "missing"
+        for name in EXPECTED_INDEXES
+    }
+
+
+def check_indexes() -> bool:
+    """启动检查：缺失或无效的索引记录警告，全部正常时返回 True"""
+    status = index_status()
+    for name, state in status.items():
+        if state != "ok":
+            logger.warning(
+                f"索引 {name}（{EXPECTED_INDEXES[name]}）状态为 {state}，请执行 python -m app.migrate"
+            )
+    return all(state == "ok" for state in status.values())
+
+
+def main(argv: List[str]) -> int:
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    command = argv[0] if argv else "apply"
+    if command == "apply":
+        applied = apply_migrations()
+        logger.info(f"迁移完成，本次执行 {len(applied)} 个: {applied}")
+        return 0 if check_indexes() else 1
+    if command == "status":
+        connection = _connect()
+        try:
+            with connection.cursor() as cursor:
+                applied = _applied_versions(cursor)
+        finally:
+            connection.close()
+        for version, _ in load_migrations():
+            print(f"{'applied' if version in applied else 'pending':8} {version}")
+        for name, state in index_status().items():
+            print(f"{state:8} {name}")
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,7 @@
+-- migrate:no-transaction
+-- /api/matches：WHERE 平均赔率 IS NOT NULL AND fixture_date BETWEEN ... ORDER BY fixture_date, id
+--   分页时再加 AND (fixture_date, id) > 游标 ... LIMIT n
+-- 部分索引只包含有赔率的比赛，范围扫描直接按 (fixture_date, id) 顺序返回，无需排序
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ai_eval_odds_fixture_date_id_idx
+    ON ai_eval (fixture_date, id)
+    WHERE 平均赔率 IS NOT NULL;
@@ -0,0 +1,10 @@
+-- migrate:no-transaction
+-- /api/ai-recommendations：WHERE 比赛是否推荐 = 1 AND 平均赔率 IS NOT NULL AND reason_dict IS NOT NULL
+--   AND fixture_date BETWEEN ... ORDER BY 推荐指数 DESC LIMIT 3
+-- 谓词与查询完全一致的部分索引，以 fixture_date 为前导列：扫描范围只有窗口内的推荐比赛，
+-- 不随历史数据增长（以 推荐指数 为前导列的有序扫描会先扫过全部历史高分行）。
+-- 窗口内候选行很少，top-3 在内存中堆排序完成。索引只负责过滤与排序：
+-- 两种推荐查询都要读取 平均赔率、reason_dict、比赛预测及原因 等大字段，仍需回表取这几行
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ai_eval_recommended_window_idx
+    ON ai_eval (fixture_date, 推荐指数 DESC)
+    WHERE 比赛是否推荐 = 1 AND 平均赔率 IS NOT NULL AND reason_dict IS NOT NULL;
@@ -0,0 +1,13 @@
+-- ai_eval 变更通知（快照缓存 / 变更流监听 ai_eval_changed 频道，与 snapshot_cache.NOTIFY_CHANNEL 一致）
+-- 语句级触发器，每条写入语句只发一次 NOTIFY
+CREATE OR REPLACE FUNCTION notify_ai_eval_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('ai_eval_changed', TG_OP);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS ai_eval_changed_notify ON ai_eval;
+CREATE TRIGGER ai_eval_changed_notify
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON ai_eval
+FOR EACH STATEMENT EXECUTE FUNCTION notify_ai_eval_changed();
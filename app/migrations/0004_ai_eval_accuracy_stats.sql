@@ -0,0 +1,25 @@
+-- 预测命中率统计
+-- 实际结果：比赛结算后由写入 ai_eval 的任务填写（home / draw / away，与 预测结果 取值一致）
+ALTER TABLE ai_eval ADD COLUMN IF NOT EXISTS 实际结果 TEXT;
+
+-- 每场已结算比赛计入统计时的分桶与命中情况；增量刷新时与当前值比较，差异部分先减后加
+CREATE TABLE IF NOT EXISTS ai_eval_stats_ledger (
+    ai_eval_id BIGINT PRIMARY KEY,
+    fixture_date TIMESTAMP,
+    league TEXT NOT NULL,
+    index_bucket TEXT NOT NULL,
+    odds_band TEXT NOT NULL,
+    recommended BOOLEAN NOT NULL,
+    hit BOOLEAN NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ai_eval_stats_ledger_fixture_date_idx ON ai_eval_stats_ledger (fixture_date);
+
+-- 按维度汇总的计数，接口直接读取（行数 = 桶数）
+CREATE TABLE IF NOT EXISTS ai_eval_accuracy (
+    dimension TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    total BIGINT NOT NULL DEFAULT 0,
+    hits BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (dimension, bucket)
+);
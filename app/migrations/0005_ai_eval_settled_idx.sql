@@ -0,0 +1,5 @@
+-- migrate:no-transaction
+-- 统计增量刷新：WHERE 实际结果 IS NOT NULL AND fixture_date >= 回溯起点
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ai_eval_settled_fixture_date_idx
+    ON ai_eval (fixture_date)
+    WHERE 实际结果 IS NOT NULL;
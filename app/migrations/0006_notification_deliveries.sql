@@ -0,0 +1,11 @@
+-- 通知投递状态与幂等 key：多个 worker 收到同一 key 时只有 INSERT 成功的一个负责发送
+CREATE TABLE IF NOT EXISTS notification_deliveries (
+    key TEXT PRIMARY KEY,
+    chat_id BIGINT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    attempts INT NOT NULL DEFAULT 1,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -0,0 +1,282 @@
+import asyncio
+import cProfile
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import random
+import re
+import secrets
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SORT_KEYS = ("cumulative", "tottime", "calls")
+
+
+# 进程标识：多 worker 部署时区分 profile 来自哪个进程
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+_PROFILE_ID = re.compile(r"^[0-9a-f]{12}$")
+
+
+class _Profile:
+    __slots__ = ("meta", "stats")
+
+    def __init__(self, meta: Dict[str, Any], stats: Dict):
+        self.meta = meta
+        # cProfile 的原始统计（pstats 格式），下载时用 marshal 序列化
+        self.stats = stats
+
+    @classmethod
+    def from_request(cls, profile_id: str, scope, status: int, duration: float, trigger: str, stats: Dict, truncated: bool = False) -> "_Profile":
+        route = scope.get("route")
+        return cls({
+            "id": profile_id,
+            "worker": WORKER_ID,
+            "method": scope["method"],
+            "path": getattr(route, "path", None) or scope["path"],
+            "query": scope.get("query_string", b"").decode("latin-1"),
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+            "trigger": trigger,
+            "truncated": truncated,
+            "created_at": time.time(),
+        }, stats)
+
+    @property
+    def profile_id(self) -> str:
+        return self.meta["id"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.meta)
+
+
+class ProfileStore:
+    """最近的请求 profile，最多保留 max_entries 个
+
+    未设置 directory 时保存在本进程内存的环形缓冲区中，多 worker 部署时只能从
+    采集它的 worker 下载（见 worker 字段）；设置 directory（PROFILE_DIR）时写入共享目录
+    （<id>.prof 与 <id>.json），任一 worker 都能列出和下载，超出上限时删除最早的。
+    """
+
+    def __init__(self, max_entries: int = 20, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._profiles: deque = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def add(self, profile: _Profile) -> None:
+        if self.directory:
+            self._write(profile)
+            return
+        with self._lock:
+            self._profiles.append(profile)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """最新的在前"""
+        if self.directory:
+            return sorted(self._read_metas(), key=lambda meta: meta["created_at"], reverse=True)
+        with self._lock:
+            return [profile.to_dict() for profile in reversed(self._profiles)]
+
+    def get(self, profile_id: str) -> Optional[_Profile]:
+        if self.directory:
+            return self._read(profile_id)
+        with self._lock:
+            for profile in self._profiles:
+                if profile.profile_id == profile_id:
+                    return profile
+        return None
+
+    def clear(self) -> None:
+        if self.directory:
+            for meta in self._read_metas():
+                self._remove(meta["id"])
+            return
+        with self._lock:
+            self._profiles.clear()
+
+    # ---- 共享目录 ----
+
+    def _path(self, profile_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}{suffix}")
+
+    def _write(self, profile: _Profile) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # 先写 .prof 再写 .json：列表只读 .json，不会列出未写完的 profile
+            for suffix, data in ((".prof", marshal.dumps(profile.stats)), (".json", json.dumps(profile.meta).encode())):
+                path = self._path(profile.profile_id, suffix)
+                with open(path + ".tmp", "wb") as f:
+                    f.write(data)
+                os.replace(path + ".tmp", path)
+            for meta in self.list()[self.max_entries:]:
+                self._remove(meta["id"])
+        except OSError as e:
+            logger.error(f"保存 profile {profile.profile_id} 失败: {e}")
+
+    def _read_metas(self) -> List[Dict[str, Any]]:
+        metas = []
+        if not os.path.isdir(self.directory):
+            return metas
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    metas.append(json.load(f))
+            except (OSError, ValueError):
+                # 可能刚被其它 worker 删除
+                continue
+        return metas
+
+    def _read(self, profile_id: str) -> Optional[_Profile]:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id, ".json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(self._path(profile_id, ".prof"), "rb") as f:
+                stats = marshal.load(f)
+        except (OSError, ValueError, EOFError):
+            return None
+        return _Profile(meta, stats)
+
+    def _remove(self, profile_id: str) -> None:
+        for suffix in (".json", ".prof"):
+            try:
+                os.remove(self._path(profile_id, suffix))
+            except OSError:
+                pass
+
+    @staticmethod
+    def dump(profile: _Profile) -> bytes:
+        """与 cProfile 的 .prof 文件格式相同，可用 pstats / snakeviz 打开"""
+        return marshal.dumps(profile.stats)
+
+    @staticmethod
+    def text(profile: _Profile, sort: str = "cumulative", limit: int = 50) -> str:
+        """pstats 文本报告，按 sort 排序的前 limit 个函数"""
+        buffer = io.StringIO()
+        stats = pstats.Stats(stream=buffer)
+        stats.stats = dict(profile.stats)
+        stats.get_top_level_stats()
+        stats.sort_stats(sort).print_stats(limit)
+        return buffer.getvalue()
+
+
+class ProfilingMiddleware:
+    """按需对单个请求做 cProfile（纯 ASGI 中间件）
+
+    - 请求头 X-Profile 且 X-Admin-Token 与 ADMIN_TOKEN 一致时必定采集
+    - 否则按 sample_rate 对 path_prefix 下的请求抽样（默认 0，不抽样）
+    - 覆盖整个请求：查询与等待数据库（事件循环的 poll）、JSON 解码、格式化循环和响应序列化
+    - 同一时刻只采集一个请求；采集期间同一事件循环上其它请求的执行也会计入，
+      同步路由在线程池中执行的部分不计入
+    - 长连接（SSE、流式导出）不参与抽样；带请求头采集时最多采集 max_duration 秒，
+      到时停止并保存截断的 profile（truncated），连接本身继续
+    - 结果存入 ProfileStore，响应头 X-Profile-Id 返回 profile 编号
+    """
+
+    # 长时间保持连接的路由：采集会覆盖整个连接期间同一 worker 上的所有请求
+    STREAMING_PREFIXES = ("/api/stream/", "/api/export/")
+
+    def __init__(
+        self,
+        app,
+        store: Optional[ProfileStore] = None,
+        sample_rate: Optional[float] = None,
+        path_prefix: str = "/api/",
+        max_duration: Optional[float] = None,
+    ):
+        self.app = app
+        self.store = store or profile_store
+        self.sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0")) if sample_rate is None else sample_rate
+        self.path_prefix = path_prefix
+        self.max_duration = float(os.getenv("PROFILE_MAX_SECONDS", "30")) if max_duration is None else max_duration
+        self._active = False
+
+    def _trigger(self, scope) -> Optional[str]:
+        requested = False
+        token = None
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                requested = True
+            elif name == b"x-admin-token":
+                token = value.decode("latin-1")
+        if requested:
+            admin_token = os.getenv("ADMIN_TOKEN")
+            if admin_token and token and secrets.compare_digest(token, admin_token):
+                return "header"
+        path = scope["path"]
+        if (
+            self.sample_rate > 0
+            and path.startswith(self.path_prefix)
+            and not path.startswith("/api/admin/")
+            and not path.startswith(self.STREAMING_PREFIXES)
+            and random.random() < self.sample_rate
+        ):
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active:
+            await self.app(scope, receive, send)
+            return
+        trigger = self._trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # 其它 profiler 已在运行
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        self._active = True
+        start = time.perf_counter()
+        stopped = False
+
+        def stop(truncated: bool) -> None:
+            nonlocal stopped
+            if stopped:
+                return
+            stopped = True
+            profiler.disable()
+            duration = time.perf_counter() - start
+            self._active = False
+            profiler.create_stats()
+            self.store.add(_Profile.from_request(profile_id, scope, status, duration, trigger, profiler.stats, truncated))
+
+        timer = asyncio.get_running_loop().call_later(self.max_duration, stop, True)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            timer.cancel()
+            stop(False)
+
+# 全局 profile 存储
+profile_store = ProfileStore(
+    max_entries=int(os.getenv("PROFILE_MAX_ENTRIES", "20")),
+    directory=os.getenv("PROFILE_DIR") or None,
+)
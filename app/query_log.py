@@ -0,0 +1,130 @@
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+# WITH 中可以包含写操作（WITH ... INSERT / 数据修改 CTE），SELECT ... FOR UPDATE 会加锁
+_WRITE_KEYWORD = re.compile(r"\b(?:INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+
+def normalize_sql(query: str) -> str:
+    """归一化 SQL：合并空白、字面量替换为 ?，用于按查询形状聚合"""
+    query = _STRING_LITERAL.sub("?", query)
+    query = _NUMBER_LITERAL.sub("?", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def is_explainable(query: str) -> bool:
+    """只对只读查询执行 EXPLAIN ANALYZE（ANALYZE 会真正执行语句）"""
+    head = query.lstrip().split(None, 1)
+    if not head or head[0].upper() not in ("SELECT", "WITH"):
+        return False
+    return not _WRITE_KEYWORD.search(_STRING_LITERAL.sub("?", query))
+
+
+class _QueryShape:
+    __slots__ = ("name", "sql", "count", "total", "max", "last_params", "last_rows", "last_at", "explain", "explain_at")
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last_params: Optional[str] = None
+        self.last_rows: Optional[int] = None
+        self.last_at: Optional[float] = None
+        self.explain: Optional[str] = None
+        self.explain_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "last_params": self.last_params,
+            "last_rows": self.last_rows,
+            "last_at": self.last_at,
+            "explain": self.explain,
+            "explain_at": self.explain_at,
+        }
+
+
+class SlowQueryLog:
+    """慢查询日志
+
+    - 超过 threshold 的查询记录归一化 SQL、参数、耗时和行数
+    - 按 explain_sample_rate 抽样，由调用方在后台补充 EXPLAIN (ANALYZE, BUFFERS) 输出
+    - 按查询形状聚合，供管理接口查看启动以来最慢的查询
+    """
+
+    def __init__(self, threshold: float = 0.2, explain_sample_rate: float = 0.1, max_shapes: int = 500):
+        self.threshold = threshold
+        self.explain_sample_rate = explain_sample_rate
+        self.max_shapes = max_shapes
+        self._shapes: Dict[str, _QueryShape] = {}
+        self._lock = threading.Lock()
+
+    def is_slow(self, duration: float) -> bool:
+        return duration >= self.threshold
+
+    def record(self, name: str, query: str, params, duration: float, rows: Optional[int]) -> Optional[str]:
+        """记录一条慢查询；需要补充 EXPLAIN 时返回查询形状 key，否则返回 None"""
+        sql = normalize_sql(query)
+        params_text = repr(params) if params is not None else None
+        logger.warning(f"慢查询 [{name}] {duration * 1000:.1f}ms rows={rows} sql={sql} params={params_text}")
+
+        with self._lock:
+            shape = self._shapes.get(sql)
+            if shape is None:
+                if len(self._shapes) >= self.max_shapes:
+                    return None
+                shape = self._shapes[sql] = _QueryShape(name, sql)
+            shape.count += 1
+            shape.total += duration
+            shape.max = max(shape.max, duration)
+            shape.last_params = params_text
+            shape.last_rows = rows
+            shape.last_at = time.time()
+
+        if is_explainable(query) and random.random() < self.explain_sample_rate:
+            return sql
+        return None
+
+    def attach_explain(self, key: str, plan: str) -> None:
+        with self._lock:
+            shape = self._shapes.get(key)
+            if shape is not None:
+                shape.explain = plan
+                shape.explain_at = time.time()
+
+    def top(self, limit: int = 20, order_by: str = "max") -> List[Dict[str, Any]]:
+        """按最大耗时（max）或累计耗时（total）排序的前 N 个查询形状"""
+        with self._lock:
+            shapes = [shape.to_dict() for shape in self._shapes.values()]
+        key = "total_ms" if order_by == "total" else "max_ms"
+        return sorted(shapes, key=lambda s: s[key], reverse=True)[:limit]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._shapes.clear()
+
+
+EXPLAIN_PREFIX = "EXPLAIN (ANALYZE, BUFFERS) "
+
+# 全局慢查询日志实例
+slow_query_log = SlowQueryLog(
+    threshold=float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200")) / 1000,
+    explain_sample_rate=float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0.1")),
+)
@@ -0,0 +1,391 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from telegram.error import BadRequest, ChatMigrated, Forbidden, NetworkError, RetryAfter
+from ..metrics import BROADCAST_MESSAGES, TELEGRAM_SEND_LATENCY, TELEGRAM_SEND_TOTAL
+
+logger = logging.getLogger(__name__)
+
+
+def _seconds(value) -> float:
+    """RetryAfter.retry_after 可能是 int 或 timedelta"""
+    return value.total_seconds() if hasattr(value, "total_seconds") else float(value)
+
+
+class TokenBucket:
+    """全局令牌桶：平均 rate 条/秒，最多突发 capacity 条
+
+    默认 capacity 为 1：两次发送至少间隔 1/rate 秒，任意 1 秒内不超过 rate 条。
+    桶若从 rate 个令牌开始，第一秒会放行约 2×rate 条，超出 Telegram 的全局限制。
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = min(1.0, capacity)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """收到 RetryAfter 时暂停所有发送"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class RateLimitedSender:
+    """按 Telegram 限制发送消息：全局令牌桶 + 单聊天最小间隔，处理 RetryAfter 并对临时错误退避重试"""
+
+    def __init__(
+        self,
+        bot,
+        rate: float = 25.0,
+        per_chat_interval: float = 1.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+    ):
+        self.bot = bot
+        self.bucket = TokenBucket(rate)
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._chat_next_at: Dict[int, float] = {}
+
+    async def _wait_chat(self, chat_id: int) -> None:
+        now = time.monotonic()
+        next_at = self._chat_next_at.get(chat_id, 0.0)
+        self._chat_next_at[chat_id] = max(now, next_at) + self.per_chat_interval
+        if next_at > now:
+            await asyncio.sleep(next_at - now)
+        if len(self._chat_next_at) > 10000:
+            self._chat_next_at = {k: v for k, v in self._chat_next_at.items() if v > now}
+
+    async def _send_once(self, chat_id: int, text: str, **kwargs) -> None:
+        start = time.perf_counter()
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+        finally:
+            TELEGRAM_SEND_LATENCY.observe(time.perf_counter() - start)
+
+    async def send(self, chat_id: int, text: str, **kwargs) -> bool:
+        """发送一条消息，成功返回 True；永久性错误或重试耗尽返回 False"""
+        attempt = 0
+        while True:
+            await self._wait_chat(chat_id)
+            await self.bucket.acquire()
+            try:
+                await self._send_once(chat_id, text, **kwargs)
+                TELEGRAM_SEND_TOTAL.labels("success").inc()
+                return True
+            except RetryAfter as e:
+                TELEGRAM_SEND_TOTAL.labels("retry_after").inc()
+                wait = _seconds(e.retry_after)
+                logger.warning(f"触发 Telegram 限流，暂停 {wait} 秒")
+                self.bucket.pause(wait)
+                if attempt >= self.max_retries:
+                    logger.error(f"向用户 {chat_id} 发送消息失败，限流重试 {attempt} 次后放弃")
+                    return False
+            except (Forbidden, BadRequest, ChatMigrated) as e:
+                # 用户屏蔽 bot、chat 不存在等，重试无意义
+                TELEGRAM_SEND_TOTAL.labels("rejected").inc()
+                logger.info(f"向用户 {chat_id} 发送消息失败（不重试）: {e}")
+                return False
+            except NetworkError as e:
+                TELEGRAM_SEND_TOTAL.labels("network_error").inc()
+                if attempt >= self.max_retries:
+                    logger.error(f"向用户 {chat_id} 发送消息失败，已重试 {attempt} 次: {e}")
+                    return False
+                await asyncio.sleep(self.backoff_base * (2 ** attempt))
+            attempt += 1
+
+
+class BroadcastJob:
+    """一次广播任务的进度与可恢复状态"""
+
+    def __init__(
+        self,
+        job_id: str,
+        text: str,
+        notify_chat_id: Optional[int] = None,
+        notify_message_id: Optional[int] = None,
+        texts: Optional[Dict[str, str]] = None,
+    ):
+        self.job_id = job_id
+        self.text = text
+        # 按语言预先渲染好的消息（定时推送）；未匹配语言的用户收到 text。为 None 时是普通广播
+        self.texts = texts
+        self.notify_chat_id = notify_chat_id
+        self.notify_message_id = notify_message_id
+        self.status = "pending"
+        self.sent = 0
+        self.failed = 0
+        # 低水位：不大于该 chat_id 的用户均已处理，恢复时从其后继续
+        self.cursor: Optional[int] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        return {
+            "job_id": self.job_id,
+            "text": self.text,
+            "texts": self.texts,
+            "notify_chat_id": self.notify_chat_id,
+            "notify_message_id": self.notify_message_id,
+            "status": self.status,
+            "sent": self.sent,
+            "failed": self.failed,
+            "cursor": self.cursor,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "rate": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BroadcastJob":
+        job = cls(data["job_id"], data["text"], data.get("notify_chat_id"), data.get("notify_message_id"), data.get("texts"))
+        for field in ("status", "sent", "failed", "cursor", "created_at", "started_at", "finished_at", "error"):
+            if field in data:
+                setattr(job, field, data[field])
+        return job
+
+
+# chat_id 来源：按升序产出大于给定游标的 chat_id（游标为 None 时从头开始）
+ChatIdSource = Callable[[Optional[int]], AsyncIterator[int]]
+# 同上，同时产出用户语言
+ChatLocaleSource = Callable[[Optional[int]], AsyncIterator[Tuple[int, Optional[str]]]]
+JobCallback = Callable[[BroadcastJob], Awaitable[None]]
+
+
+class BroadcastManager:
+    """后台广播任务：并发发送、进度回调、状态落盘以便重启后继续"""
+
+    def __init__(
+        self,
+        sender: RateLimitedSender,
+        chat_ids: ChatIdSource,
+        concurrency: int = 30,
+        state_dir: Optional[str] = None,
+        progress_interval: float = 5.0,
+        chat_locales: Optional[ChatLocaleSource] = None,
+    ):
+        self.sender = sender
+        self.chat_ids = chat_ids
+        self.chat_locales = chat_locales
+        self.concurrency = concurrency
+        self.state_dir = state_dir
+        self.progress_interval = progress_interval
+        self.jobs: Dict[str, BroadcastJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # 多 worker 部署时只有 leader 执行任务，其它 worker 只落盘待 leader 接手
+        self.owner = True
+        self._watch_task: Optional[asyncio.Task] = None
+        self.on_progress: Optional[JobCallback] = None
+        self.on_finish: Optional[JobCallback] = None
+
+    def start(
+        self,
+        text: str,
+        notify_chat_id: Optional[int] = None,
+        notify_message_id: Optional[int] = None,
+        texts: Optional[Dict[str, str]] = None,
+        job_id: Optional[str] = None,
+    ) -> BroadcastJob:
+        """创建并在后台启动广播任务，立即返回
+
+        texts 为按语言渲染好的消息（原样发送，不加广播前缀）；job_id 可指定，用于按日期去重的定时推送
+        """
+        job = BroadcastJob(job_id or uuid.uuid4().hex[:12], text, notify_chat_id, notify_message_id, texts)
+        self.jobs[job.job_id] = job
+        if self.owner:
+            self._spawn(job)
+        else:
+            job.status = "queued"
+            self._save(job)
+        return job
+
+    def _spawn(self, job: BroadcastJob) -> None:
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job.job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.job_id, None))
+
+    async def wait(self, job_id: str) -> BroadcastJob:
+        """等待本进程执行的任务结束；已交给 leader 的任务（queued）立即返回，进度见状态目录"""
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.shield(task)
+        return self.jobs[job_id]
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return [job.to_dict() for job in sorted(self.jobs.values(), key=lambda j: j.created_at, reverse=True)]
+
+    def load_states(self) -> List[BroadcastJob]:
+        """从状态目录读取任务（包括其它 worker 创建的任务）"""
+        jobs = []
+        if not self.state_dir or not os.path.isdir(self.state_dir):
+            return jobs
+        for name in os.listdir(self.state_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.state_dir, name), encoding="utf-8") as f:
+                    job = BroadcastJob.from_dict(json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"读取广播任务状态失败 {name}: {e}")
+                continue
+            # 本进程正在执行的任务以内存状态为准
+            if job.job_id not in self._tasks:
+                self.jobs[job.job_id] = job
+            jobs.append(self.jobs[job.job_id])
+        return jobs
+
+    async def resume(self) -> None:
+        """继续未完成的任务（重启后或由其它 worker 提交的任务）"""
+        if not self.owner:
+            return
+        for job in self.load_states():
+            if job.status in ("pending", "queued", "running") and job.job_id not in self._tasks:
+                logger.info(f"继续未完成的广播任务 {job.job_id}，从 chat_id > {job.cursor} 开始")
+                self._spawn(job)
+
+    def start_watching(self, interval: float = 5.0) -> None:
+        """leader 定期扫描状态目录，接手其它 worker 提交的任务"""
+        async def watch():
+            while True:
+                await self.resume()
+                await asyncio.sleep(interval)
+
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(watch())
+
+    async def shutdown(self) -> None:
+        """停止所有运行中的任务（状态保留为 running，由下一个 leader 或下次启动继续）"""
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _save(self, job: BroadcastJob) -> None:
+        if not self.state_dir:
+            return
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            path = os.path.join(self.state_dir, f"{job.job_id}.json")
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(job.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.error(f"保存广播任务状态失败 {job.job_id}: {e}")
+
+    async def _callback(self, callback: Optional[JobCallback], job: BroadcastJob) -> None:
+        if callback is None:
+            return
+        try:
+            await callback(job)
+        except Exception as e:
+            logger.error(f"广播任务回调失败 {job.job_id}: {e}")
+
+    async def _run(self, job: BroadcastJob) -> None:
+        job.status = "running"
+        job.started_at = job.started_at or time.time()
+        self._save(job)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        dispatched: deque = deque()
+        done: set = set()
+        last_report = time.monotonic()
+        if job.texts is not None and self.chat_locales is not None:
+            # 每种语言的消息只渲染一次，逐用户只做发送
+            texts = job.texts
+            recipients = (
+                (chat_id, texts.get(locale, job.text)) async for chat_id, locale in self.chat_locales(job.cursor)
+            )
+        else:
+            text = job.text if job.texts is not None else f"📢 系统广播\n\n{job.text}"
+            recipients = ((chat_id, text) async for chat_id in self.chat_ids(job.cursor))
+
+        async def worker():
+            nonlocal last_report
+            while True:
+                chat_id, text = await queue.get()
+                try:
+                    try:
+                        ok = await self.sender.send(chat_id, text)
+                    except Exception as e:
+                        # send 未处理的错误（例如 InvalidToken、Conflict）只计为失败，worker 继续处理后续用户
+                        logger.error(f"向用户 {chat_id} 发送广播失败: {e}")
+                        ok = False
+                    if ok:
+                        job.sent += 1
+                        BROADCAST_MESSAGES.labels("sent").inc()
+                    else:
+                        job.failed += 1
+                        BROADCAST_MESSAGES.labels("failed").inc()
+                    done.add(chat_id)
+                    # 推进低水位
+                    while dispatched and dispatched[0] in done:
+                        job.cursor = dispatched.popleft()
+                        done.discard(job.cursor)
+                    now = time.monotonic()
+                    if now - last_report >= self.progress_interval:
+                        last_report = now
+                        self._save(job)
+                        await self._callback(self.on_progress, job)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            async for chat_id, text in recipients:
+                dispatched.append(chat_id)
+                await queue.put((chat_id, text))
+            await queue.join()
+            job.status = "completed"
+        except asyncio.CancelledError:
+            # 进程关闭：保持 running 状态以便恢复
+            self._save(job)
+            raise
+        except Exception as e:
+            logger.error(f"广播任务 {job.job_id} 失败: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        job.finished_at = time.time()
+        self._save(job)
+        logger.info(f"广播完成，成功发送给 {job.sent}/{job.processed} 个用户")
+        await self._callback(self.on_finish, job)
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from .snapshot_cache import SnapshotCache
+
+logger = logging.getLogger(__name__)
+
+SnapshotLoader = Callable[[], Awaitable[List[Dict[str, Any]]]]
+
+
+def diff_snapshots(old: Dict[str, Dict[str, Any]], new: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """按 id 比较两个快照，返回新增、变化和删除的行"""
+    added = [row for key, row in new.items() if key not in old]
+    changed = [row for key, row in new.items() if key in old and old[key] != row]
+    removed = [key for key in old if key not in new]
+    return {"added": added, "changed": changed, "removed": removed}
+
+
+class ChangeFeed:
+    """共享变更流：一个后台任务监听快照缓存失效并计算行级差异，扇出给所有订阅者
+
+    - 订阅时先收到完整快照，之后只收到 diff
+    - 没有订阅者时后台任务自动退出
+    - 订阅者队列满（客户端太慢）时断开该订阅者，客户端重连后重新获取快照
+    """
+
+    def __init__(self, name: str, loader: SnapshotLoader, cache: SnapshotCache, refresh_interval: float = 60.0, queue_size: int = 100):
+        self.name = name
+        self.loader = loader
+        self.cache = cache
+        self.refresh_interval = refresh_interval
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._snapshot: Optional[Dict[str, Dict[str, Any]]] = None
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _on_invalidate(self) -> None:
+        self._changed.set()
+
+    async def _load(self) -> Dict[str, Dict[str, Any]]:
+        rows = await self.loader()
+        return {row["id"]: row for row in rows}
+
+    async def subscribe(self) -> asyncio.Queue:
+        """订阅变更；返回的队列第一条消息是完整快照"""
+        if self._snapshot is None or self._task is None or self._task.done():
+            self._snapshot = await self._load()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        queue.put_nowait(("snapshot", list(self._snapshot.values())))
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self.cache.add_invalidate_callback(self._on_invalidate)
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+        if not self._subscribers:
+            # 唤醒后台任务使其退出
+            self._changed.set()
+
+    def _publish(self, event: str, data: Any) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                logger.warning(f"{self.name} 变更流订阅者处理过慢，断开连接")
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("close", None))
+
+    async def _run(self) -> None:
+        try:
+            while self._subscribers:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=self.refresh_interval)
+                except asyncio.TimeoutError:
+                    # 兜底刷新：时间窗口滚动或错过通知
+                    pass
+                self._changed.clear()
+                if not self._subscribers:
+                    break
+                try:
+                    snapshot = await self._load()
+                except Exception as e:
+                    logger.error(f"{self.name} 变更流刷新失败: {e}")
+                    continue
+                diff = diff_snapshots(self._snapshot or {}, snapshot)
+                self._snapshot = snapshot
+                if diff["added"] or diff["changed"] or diff["removed"]:
+                    self._publish("diff", diff)
+        finally:
+            self.cache.remove_invalidate_callback(self._on_invalidate)
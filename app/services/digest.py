@@ -0,0 +1,60 @@
+from datetime import datetime, time as dtime, timedelta
+from typing import Any, Dict, List, Optional
+
+# 每日推送的文案，按语言；未列出的语言使用英文文案（分析内容仍按用户语言在SQL中选取）
+DIGEST_TEMPLATES: Dict[str, Dict[str, Any]] = {
+    "zh": {
+        "title": "📅 今日AI推荐",
+        "item": "{n}. {league}｜{home} vs {away}\n🕒 {kickoff}\n🎯 {prediction}（推荐指数 {index:.2f}）\n{analysis}",
+        "footer": "查看全部比赛：{site_url}",
+        "predictions": {"home": "主胜", "draw": "平局", "away": "客胜"},
+    },
+    "en": {
+        "title": "📅 Today's AI picks",
+        "item": "{n}. {league} | {home} vs {away}\n🕒 {kickoff}\n🎯 {prediction} (index {index:.2f})\n{analysis}",
+        "footer": "All matches: {site_url}",
+        "predictions": {"home": "Home win", "draw": "Draw", "away": "Away win"},
+    },
+}
+
+# 单条分析的最大长度，保证整条消息远小于 Telegram 的 4096 字符限制
+MAX_ANALYSIS_LENGTH = 300
+
+
+def _truncate(text: Optional[str], limit: int = MAX_ANALYSIS_LENGTH) -> str:
+    text = (text or "").strip()
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def render_digest(locale: str, recommendations: List[Dict[str, Any]], site_url: str) -> str:
+    """把推荐快照（compact 格式）渲染为一条推送消息"""
+    template = DIGEST_TEMPLATES.get(locale) or DIGEST_TEMPLATES["en"]
+    labels = template["predictions"]
+    items = []
+    for n, rec in enumerate(recommendations, 1):
+        fixture_date = rec.get("fixture_date")
+        items.append(template["item"].format(
+            n=n,
+            league=rec.get("league") or "",
+            home=rec.get("home_team") or "",
+            away=rec.get("away_team") or "",
+            kickoff=fixture_date.strftime("%m-%d %H:%M") if isinstance(fixture_date, datetime) else "",
+            prediction=labels.get(rec.get("prediction_result"), rec.get("prediction_result") or ""),
+            index=rec.get("recommendation_index") or 0.0,
+            analysis=_truncate(rec.get("analysis")),
+        ))
+    return "\n\n".join([template["title"], *items, template["footer"].format(site_url=site_url)])
+
+
+def parse_digest_time(value: str) -> dtime:
+    """HH:MM（本地时间）"""
+    hour, minute = value.strip().split(":")
+    return dtime(int(hour), int(minute))
+
+
+def next_digest_run(at: dtime, now: datetime, grace: timedelta) -> datetime:
+    """下一次推送时间；今天的推送时间刚过去不超过 grace 时立即补发"""
+    today = datetime.combine(now.date(), at)
+    if now < today or now - today <= grace:
+        return today
+    return today + timedelta(days=1)
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+import socket
+from typing import Awaitable, Callable, Optional
+import psycopg
+from ..database import _conn_kwargs
+
+logger = logging.getLogger(__name__)
+
+LeaderCallback = Callable[[], Awaitable[None]]
+
+
+class LeaderElector:
+    """基于 Postgres advisory lock 的多 worker 选主
+
+    每个 worker 用一条专用连接尝试 pg_try_advisory_lock，拿到锁的 worker 成为 leader。
+    leader 进程退出或连接断开时锁由服务端自动释放，其它 worker 在下一轮检查中接管。
+    禁用选主时（单进程部署）本 worker 直接成为 leader。
+    """
+
+    def __init__(self, lock_key: int, enabled: bool = True, interval: float = 5.0):
+        self.lock_key = lock_key
+        self.enabled = enabled
+        self.interval = interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+        self.on_elected: Optional[LeaderCallback] = None
+        self.on_demoted: Optional[LeaderCallback] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _call(self, callback: Optional[LeaderCallback]) -> None:
+        if callback is None:
+            return
+        try:
+            await callback()
+        except Exception as e:
+            logger.error(f"leader 状态切换回调失败: {e}")
+
+    async def start(self) -> None:
+        """开始参与选主"""
+        if not self.enabled:
+            self.is_leader = True
+            await self._call(self.on_elected)
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """退出选主（连接关闭后锁自动释放）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        elif self.is_leader:
+            self.is_leader = False
+            await self._call(self.on_demoted)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                connection = await psycopg.AsyncConnection.connect(
+                    autocommit=True,
+                    application_name=f"leader:{self.worker_id}"[:63],
+                    **_conn_kwargs(),
+                )
+                async with connection:
+                    while True:
+                        cursor = await connection.execute("SELECT pg_try_advisory_lock(%s)", (self.lock_key,))
+                        (acquired,) = await cursor.fetchone()
+                        if acquired:
+                            break
+                        await asyncio.sleep(self.interval)
+
+                    self.is_leader = True
+                    logger.info(f"worker {self.worker_id} 成为 leader")
+                    await self._call(self.on_elected)
+
+                    # 持有锁期间定期检查连接，连接断开即视为失去 leader 身份
+                    while True:
+                        await asyncio.sleep(self.interval)
+                        await connection.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"选主连接异常: {e}")
+            finally:
+                if self.is_leader:
+                    self.is_leader = False
+                    logger.info(f"worker {self.worker_id} 不再是 leader")
+                    await self._call(self.on_demoted)
+            await asyncio.sleep(self.interval)
+
+    async def current_leader(self, db) -> Optional[str]:
+        """查询当前持有锁的 worker"""
+        if not self.enabled:
+            return self.worker_id
+        row = await db.fetch_one(
+            """
+            SELECT a.application_name
+            FROM pg_locks l
+            JOIN pg_stat_activity a ON a.pid = l.pid
+            WHERE l.locktype = 'advisory'
+            AND l.granted
+            AND l.classid::bigint = %s
+            AND l.objid::bigint = %s
+            AND l.objsubid = 1
+            """,
+            (self.lock_key >> 32, self.lock_key & 0xFFFFFFFF),
+            name="leader_lookup",
+        )
+        if not row or not row['application_name']:
+            return None
+        return row['application_name'].removeprefix("leader:")
+
+# 全局选主实例
+leader_elector = LeaderElector(
+    lock_key=int(os.getenv("LEADER_LOCK_KEY", "7315001")),
+    enabled=os.getenv("LEADER_ELECTION", "false").lower() == "true",
+    interval=float(os.getenv("LEADER_CHECK_INTERVAL", "5")),
+)
@@ -0,0 +1,252 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from ..metrics import NOTIFICATION_DELIVERIES
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_COLUMNS = "key, chat_id, status, worker, attempts, error, created_at, updated_at"
+
+# 认领幂等 key：新 key 直接插入；已失败、超过 dedupe_ttl，或 queued 状态超过 claim_timeout
+# （认领的进程退出、未发送）的 key 可以重新认领；其余情况不修改任何行（INSERT 0 0）
+CLAIM_SQL = """
+INSERT INTO notification_deliveries AS d (key, chat_id, status, worker)
+VALUES (%(key)s, %(chat_id)s, 'queued', %(worker)s)
+ON CONFLICT (key) DO UPDATE SET
+    chat_id = EXCLUDED.chat_id,
+    status = 'queued',
+    worker = EXCLUDED.worker,
+    attempts = d.attempts + 1,
+    error = NULL,
+    created_at = now(),
+    updated_at = now()
+WHERE d.status = 'failed'
+OR d.created_at < now() - make_interval(secs => %(dedupe_ttl)s)
+OR (d.status = 'queued' AND d.updated_at < now() - make_interval(secs => %(claim_timeout)s))
+"""
+
+STATUS_SQL = "UPDATE notification_deliveries SET status = %s, error = %s, updated_at = now() WHERE key = %s"
+
+
+class Delivery:
+    """一条已认领、待投递的通知；local 表示只在本进程内认领（数据库不可用）"""
+    __slots__ = ("key", "chat_id", "payload", "local")
+
+    def __init__(self, key: str, chat_id: int, payload: Dict[str, Any], local: bool = False):
+        self.key = key
+        self.chat_id = chat_id
+        self.payload = payload
+        self.local = local
+
+
+DeliverySender = Callable[[Delivery], Awaitable[bool]]
+
+
+class DeliveryQueue:
+    """通知投递队列：幂等 key 在 Postgres 中认领，消息在进程内队列中由后台 worker 发送
+
+    - enqueue 先用 INSERT ... ON CONFLICT 认领 key，只有认领成功的进程入队发送；
+      多 worker 部署时客户端重试落到其它 worker 也不会重复发送
+    - 已失败、认领超过 dedupe_ttl 秒，或 queued 超过 claim_timeout 秒的 key 可以重新提交
+    - 投递状态（queued → sent / failed）写回 notification_deliveries，任一 worker 都可查询
+    - 表不存在（迁移 0006 未执行）或数据库不可用时退回进程内去重并照常发送，
+      此时只在本 worker 内去重，状态也只能从本 worker 查询
+    """
+
+    def __init__(
+        self,
+        db,
+        send: DeliverySender,
+        worker_id: Optional[str] = None,
+        concurrency: int = 4,
+        max_size: int = 10000,
+        dedupe_ttl: float = 86400.0,
+        claim_timeout: float = 600.0,
+        drain_timeout: float = 5.0,
+    ):
+        self.db = db
+        self.send = send
+        self.worker_id = worker_id
+        self.concurrency = concurrency
+        self.max_size = max_size
+        self.dedupe_ttl = dedupe_ttl
+        self.claim_timeout = claim_timeout
+        self.drain_timeout = drain_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # 数据库不可用时在本进程内认领的投递记录，字段与 notification_deliveries 一致
+        self._local: Dict[str, Dict[str, Any]] = {}
+
+        # 统计信息（本进程）
+        self.enqueued = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.sent = 0
+        self.failed = 0
+        self.local_claims = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查询投递状态；数据库中没有记录时返回本进程内认领的记录"""
+        try:
+            delivery = await self.db.fetch_one(
+                f"SELECT {DELIVERY_COLUMNS} FROM notification_deliveries WHERE key = %s",
+                (key,),
+                name="notification_status",
+            )
+        except Exception:
+            if key not in self._local:
+                raise
+            delivery = None
+        if delivery is None and key in self._local:
+            return dict(self._local[key])
+        return delivery
+
+    def _claim_local(self, key: str, chat_id: int) -> bool:
+        """进程内认领，规则与 CLAIM_SQL 相同"""
+        now = datetime.now(timezone.utc)
+        record = self._local.get(key)
+        if record is not None and not (
+            record["status"] == "failed"
+            or record["created_at"] < now - timedelta(seconds=self.dedupe_ttl)
+            or (record["status"] == "queued" and record["updated_at"] < now - timedelta(seconds=self.claim_timeout))
+        ):
+            return False
+        if record is None and len(self._local) >= self.max_size:
+            expired = now - timedelta(seconds=self.dedupe_ttl)
+            for stale in [k for k, r in self._local.items() if r["created_at"] < expired]:
+                del self._local[stale]
+        self._local[key] = {
+            "key": key,
+            "chat_id": chat_id,
+            "status": "queued",
+            "worker": self.worker_id,
+            "attempts": record["attempts"] + 1 if record else 1,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        return True
+
+    async def enqueue(self, key: str, chat_id: int, payload: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """认领并提交投递，返回 (投递记录, 是否新提交)；队列已满时抛出 asyncio.QueueFull"""
+        if not self._workers:
+            raise RuntimeError("delivery queue is not running")
+        if self._queue.full():
+            self.rejected += 1
+            NOTIFICATION_DELIVERIES.labels("rejected").inc()
+            raise asyncio.QueueFull
+
+        # 写操作不自动重试：重试可能把本次已成功的认领误判为重复
+        try:
+            status = await self.db.execute(
+                CLAIM_SQL,
+                {
+                    "key": key,
+                    "chat_id": chat_id,
+                    "worker": self.worker_id,
+                    "dedupe_ttl": self.dedupe_ttl,
+                    "claim_timeout": self.claim_timeout,
+                },
+                name="notification_claim",
+            )
+            local = False
+            claimed = status == "INSERT 0 1"
+        except Exception as e:
+            logger.warning(f"在数据库中认领通知 {key} 失败，改为进程内去重: {e}")
+            local = True
+            claimed = self._claim_local(key, chat_id)
+            if claimed:
+                self.local_claims += 1
+        if not claimed:
+            self.duplicates += 1
+            NOTIFICATION_DELIVERIES.labels("duplicate").inc()
+            return await self.get(key), False
+
+        delivery = Delivery(key, chat_id, payload, local)
+        try:
+            self._queue.put_nowait(delivery)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            NOTIFICATION_DELIVERIES.labels("rejected").inc()
+            await self._set_status(delivery, "failed", "queue full")
+            raise
+        self.enqueued += 1
+        try:
+            return await self.get(key), True
+        except Exception as e:
+            # 已认领并入队：读取失败也返回已受理；返回错误会让客户端重试，而重试只会被当作重复
+            logger.warning(f"读取通知 {key} 的投递状态失败: {e}")
+            return {"key": key, "chat_id": chat_id, "status": "queued", "worker": self.worker_id}, True
+
+    async def _set_status(self, delivery: Delivery, status: str, error: Optional[str] = None) -> None:
+        if delivery.local:
+            record = self._local.get(delivery.key)
+            if record is not None:
+                record.update(status=status, error=error, updated_at=datetime.now(timezone.utc))
+            return
+        try:
+            await self.db.execute(STATUS_SQL, (status, error, delivery.key), name="notification_status_update")
+        except Exception as e:
+            logger.error(f"更新通知 {delivery.key} 的投递状态失败: {e}")
+
+    def start(self) -> None:
+        """启动投递 worker"""
+        if self._workers:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        """停止 worker：最多等待 drain_timeout 秒发完已排队的通知
+
+        未发完的保持 queued 状态，claim_timeout 之后可以重新提交
+        """
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"关闭时仍有 {self._queue.qsize()} 条通知未投递")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self) -> None:
+        while True:
+            delivery = await self._queue.get()
+            try:
+                error = None
+                try:
+                    ok = await self.send(delivery)
+                except Exception as e:
+                    logger.error(f"投递通知 {delivery.key} 失败: {e}")
+                    ok = False
+                    error = str(e)
+                status = "sent" if ok else "failed"
+                if ok:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+                NOTIFICATION_DELIVERIES.labels(status).inc()
+                await self._set_status(delivery, status, error)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "workers": len(self._workers),
+            "enqueued": self.enqueued,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "sent": self.sent,
+            "failed": self.failed,
+            "local_claims": self.local_claims,
+        }
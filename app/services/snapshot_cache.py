@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import psycopg
+from ..database import _conn_kwargs
+
+logger = logging.getLogger(__name__)
+
+# ai_eval 变更通知频道：触发器由迁移 0003 安装，频道名与迁移中保持一致
+NOTIFY_CHANNEL = "ai_eval_changed"
+
+
+def current_window(now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """比赛时间窗口：今天下午12点到明天24点"""
+    now = now or datetime.now()
+    today_noon = now.replace(hour=12, minute=0, second=0, microsecond=0)
+    tomorrow_end = (now + timedelta(days=1)).replace(hour=23, minute=59, second=59, microsecond=999999)
+    return today_noon, tomorrow_end
+
+
+class _Entry:
+    __slots__ = ("value", "loaded_at", "version")
+
+    def __init__(self, value: Any, loaded_at: float, version: int):
+        self.value = value
+        self.loaded_at = loaded_at
+        self.version = version
+
+
+class SnapshotCache:
+    """进程内快照缓存
+
+    - 按 key（时间窗口、语言等）缓存格式化后的结果
+    - 收到 ai_eval 的 NOTIFY 后整体失效，TTL 作为兜底
+    - 同一 key 的并发未命中只触发一次加载（single-flight）
+    - 每个 key 保留最近一次成功加载的值，stale_on_error=True 时加载失败
+      （数据库不可用、熔断中）返回该值，不受失效与 TTL 影响
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._last_good: Dict[Hashable, Any] = {}
+        self._version = 0
+        self._listener_task: Optional[asyncio.Task] = None
+        self._invalidate_callbacks: List[Callable[[], None]] = []
+        self.listening = False
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.load_errors = 0
+        self.stale_served = 0
+        self.invalidations = 0
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]], stale_on_error: bool = False) -> Any:
+        """获取缓存值，未命中或过期时调用 loader 加载；stale_on_error 时加载失败返回上次成功的值"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == self._version and time.monotonic() - entry.loaded_at < self.ttl:
+            self.hits += 1
+            return entry.value
+
+        self.misses += 1
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._load_done(key, f))
+        else:
+            self.coalesced += 1
+        # shield：单个请求被取消时不影响其它等待者
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            if stale_on_error and key in self._last_good:
+                self.stale_served += 1
+                return self._last_good[key]
+            raise
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        version = self._version
+        value = await loader()
+        now = time.monotonic()
+        self._prune(now)
+        # 条目数达到上限时（例如大量不同的 locale）不再缓存新 key
+        if key in self._entries or len(self._entries) < self.max_entries:
+            self._entries[key] = _Entry(value, now, version)
+        # 按最近成功加载排序，超出上限时淘汰最久未更新的 key（例如过去日期的时间窗口）
+        self._last_good.pop(key, None)
+        self._last_good[key] = value
+        if len(self._last_good) > self.max_entries:
+            del self._last_good[next(iter(self._last_good))]
+        self.loads += 1
+        return value
+
+    def _load_done(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled() and future.exception() is not None:
+            self.load_errors += 1
+
+    def _prune(self, now: float) -> None:
+        """清理已失效的条目（例如过去日期的时间窗口）"""
+        stale = [
+            key for key, entry in self._entries.items()
+            if entry.version != self._version or now - entry.loaded_at >= self.ttl
+        ]
+        for key in stale:
+            del self._entries[key]
+
+    def invalidate(self) -> None:
+        """使所有缓存条目失效"""
+        self._version += 1
+        self.invalidations += 1
+        for callback in self._invalidate_callbacks:
+            callback()
+
+    def add_invalidate_callback(self, callback: Callable[[], None]) -> None:
+        """注册失效回调（例如变更推送），回调需为非阻塞函数"""
+        self._invalidate_callbacks.append(callback)
+
+    def remove_invalidate_callback(self, callback: Callable[[], None]) -> None:
+        if callback in self._invalidate_callbacks:
+            self._invalidate_callbacks.remove(callback)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "loads": self.loads,
+            "load_errors": self.load_errors,
+            "stale_served": self.stale_served,
+            "invalidations": self.invalidations,
+            "listening": self.listening,
+            "ttl": self.ttl,
+        }
+
+    # ---- LISTEN / NOTIFY ----
+
+    def start(self) -> None:
+        """启动后台 LISTEN 任务"""
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """停止后台 LISTEN 任务"""
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+    async def _listen(self) -> None:
+        """监听 ai_eval 变更通知，断线后自动重连"""
+        while True:
+            try:
+                connection = await psycopg.AsyncConnection.connect(autocommit=True, **_conn_kwargs())
+                async with connection:
+                    await connection.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    self.listening = True
+                    # 断线期间可能错过通知，重连后先整体失效
+                    self.invalidate()
+                    logger.info(f"快照缓存开始监听 {NOTIFY_CHANNEL}")
+                    async for _ in connection.notifies():
+                        self.invalidate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"快照缓存监听连接异常，5秒后重连: {e}")
+            finally:
+                self.listening = False
+            await asyncio.sleep(5)
+
+# 全局快照缓存实例
+snapshot_cache = SnapshotCache(
+    ttl=float(os.getenv("SNAPSHOT_CACHE_TTL", "60")),
+    max_entries=int(os.getenv("SNAPSHOT_CACHE_MAX_ENTRIES", "256")),
+)
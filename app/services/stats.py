@@ -0,0 +1,305 @@
+"""预测命中率统计
+
+已结算（实际结果 不为空）的比赛按联赛、推荐指数区间、所选结果的赔率区间和是否推荐分桶，
+计数保存在 ai_eval_accuracy，接口读取的行数只与桶数有关。
+
+- 增量刷新：只扫描回溯窗口内已结算的比赛，与 ai_eval_stats_ledger 中上次计入的分桶比较，
+  新结算的加上，结果被修改或撤销的先减去旧值再加上新值。由后台任务定期执行。
+- 全量重建：清空后按全部历史重新计算，用于首次上线或修改回溯窗口之外的数据之后。
+
+用法：
+    python -m app.services.stats rebuild     # 全量重建
+    python -m app.services.stats refresh     # 执行一次增量刷新
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import psycopg
+from ..database import _conn_kwargs
+from ..metrics import timed_query
+from ..sql import float8_or_null
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("overall", "league", "index", "odds", "recommended")
+# 赔率区间的展示顺序（其它维度按桶名或样本数排序）
+ODDS_BANDS = ("<1.5", "1.5-2", "2-3", "3-5", "5+", "unknown")
+
+LEDGER_COLUMNS = "ai_eval_id, fixture_date, league, index_bucket, odds_band, recommended, hit"
+
+# 每场已结算比赛的分桶；所选结果的赔率取 平均赔率 中对应的 home_avg / draw_avg / away_avg，
+# 不是数字时归入 unknown（不加保护的 ::float8 遇到一行坏数据会让每次刷新都失败）
+SETTLED_SQL = f"""
+SELECT
+    e.id AS ai_eval_id,
+    e.fixture_date,
+    COALESCE(e.league_name, 'unknown') AS league,
+    CASE WHEN e.推荐指数 IS NULL THEN 'unknown'
+        ELSE to_char(b.lower / 10.0, 'FM0.0') || '-' || to_char((b.lower + 1) / 10.0, 'FM0.0')
+    END AS index_bucket,
+    CASE
+        WHEN o.picked IS NULL THEN 'unknown'
+        WHEN o.picked < 1.5 THEN '<1.5'
+        WHEN o.picked < 2 THEN '1.5-2'
+        WHEN o.picked < 3 THEN '2-3'
+        WHEN o.picked < 5 THEN '3-5'
+        ELSE '5+'
+    END AS odds_band,
+    COALESCE(e.比赛是否推荐 = 1, false) AS recommended,
+    COALESCE(e.预测结果 = e.实际结果, false) AS hit
+FROM ai_eval e
+CROSS JOIN LATERAL (SELECT LEAST(GREATEST(floor(e.推荐指数 * 10), 0), 9) AS lower) b
+CROSS JOIN LATERAL (SELECT {float8_or_null("e.平均赔率->>(e.预测结果 || '_avg')")} AS picked) o
+WHERE e.实际结果 IS NOT NULL
+"""
+
+# ledger 行展开为各维度的 (dimension, bucket)
+UNPIVOT_SQL = """
+CROSS JOIN LATERAL (VALUES
+    ('overall', 'all'),
+    ('league', s.league),
+    ('index', s.index_bucket),
+    ('odds', s.odds_band),
+    ('recommended', CASE WHEN s.recommended THEN 'yes' ELSE 'no' END)
+) AS d(dimension, bucket)
+"""
+
+REFRESH_SQL = f"""
+WITH cur AS (
+    {SETTLED_SQL}
+    AND e.fixture_date >= %(cutoff)s
+),
+changed AS (
+    SELECT c.* FROM cur c
+    LEFT JOIN ai_eval_stats_ledger l ON l.ai_eval_id = c.ai_eval_id
+    WHERE l.ai_eval_id IS NULL
+    OR (l.fixture_date, l.league, l.index_bucket, l.odds_band, l.recommended, l.hit)
+        IS DISTINCT FROM (c.fixture_date, c.league, c.index_bucket, c.odds_band, c.recommended, c.hit)
+),
+unsettled AS (
+    SELECT l.* FROM ai_eval_stats_ledger l
+    WHERE l.fixture_date >= %(cutoff)s
+    AND NOT EXISTS (SELECT 1 FROM ai_eval e WHERE e.id = l.ai_eval_id AND e.实际结果 IS NOT NULL)
+),
+stale AS (
+    SELECT {LEDGER_COLUMNS} FROM ai_eval_stats_ledger WHERE ai_eval_id IN (SELECT ai_eval_id FROM changed)
+    UNION ALL
+    SELECT {LEDGER_COLUMNS} FROM unsettled
+),
+removed AS (
+    DELETE FROM ai_eval_stats_ledger WHERE ai_eval_id IN (SELECT ai_eval_id FROM unsettled)
+),
+upserted AS (
+    INSERT INTO ai_eval_stats_ledger ({LEDGER_COLUMNS})
+    SELECT {LEDGER_COLUMNS} FROM changed
+    ON CONFLICT (ai_eval_id) DO UPDATE SET
+        fixture_date = EXCLUDED.fixture_date,
+        league = EXCLUDED.league,
+        index_bucket = EXCLUDED.index_bucket,
+        odds_band = EXCLUDED.odds_band,
+        recommended = EXCLUDED.recommended,
+        hit = EXCLUDED.hit
+),
+deltas AS (
+    SELECT d.dimension, d.bucket, sum(s.sign) AS total, sum(CASE WHEN s.hit THEN s.sign ELSE 0 END) AS hits
+    FROM (
+        SELECT {LEDGER_COLUMNS}, 1 AS sign FROM changed
+        UNION ALL
+        SELECT {LEDGER_COLUMNS}, -1 AS sign FROM stale
+    ) s
+    {UNPIVOT_SQL}
+    GROUP BY d.dimension, d.bucket
+),
+applied AS (
+    INSERT INTO ai_eval_accuracy (dimension, bucket, total, hits, updated_at)
+    SELECT dimension, bucket, total, hits, now() FROM deltas
+    WHERE total <> 0 OR hits <> 0
+    ON CONFLICT (dimension, bucket) DO UPDATE SET
+        total = ai_eval_accuracy.total + EXCLUDED.total,
+        hits = ai_eval_accuracy.hits + EXCLUDED.hits,
+        updated_at = now()
+)
+SELECT (SELECT count(*) FROM changed), (SELECT count(*) FROM unsettled)
+"""
+
+REBUILD_SQL = [
+    "TRUNCATE ai_eval_stats_ledger, ai_eval_accuracy",
+    f"INSERT INTO ai_eval_stats_ledger ({LEDGER_COLUMNS}) {SETTLED_SQL}",
+    f"""
+    INSERT INTO ai_eval_accuracy (dimension, bucket, total, hits, updated_at)
+    SELECT d.dimension, d.bucket, count(*), count(*) FILTER (WHERE s.hit), now()
+    FROM ai_eval_stats_ledger s
+    {UNPIVOT_SQL}
+    GROUP BY d.dimension, d.bucket
+    """,
+]
+
+ACCURACY_QUERY = """
+SELECT dimension, bucket, total, hits, updated_at
+FROM ai_eval_accuracy
+WHERE total > 0
+AND (%s::text IS NULL OR dimension = %s::text)
+"""
+
+
+async def refresh(connection, lookback_days: float, lock_key: int) -> Optional[Tuple[int, int]]:
+    """增量刷新，返回 (新增或变更的比赛数, 撤销结算的比赛数)；其它进程正在刷新时返回 None"""
+    cutoff = datetime.now() - timedelta(days=lookback_days)
+    async with connection.transaction():
+        cursor = await connection.execute("SELECT pg_try_advisory_xact_lock(%s)", (lock_key,))
+        (acquired,) = await cursor.fetchone()
+        if not acquired:
+            return None
+        with timed_query("stats_refresh", "async") as timer:
+            cursor = await connection.execute(REFRESH_SQL, {"cutoff": cutoff})
+            changed, unsettled = await cursor.fetchone()
+            timer.rows = changed + unsettled
+    return changed, unsettled
+
+
+async def rebuild(connection, lock_key: int) -> int:
+    """全量重建，返回计入统计的比赛数；等待正在进行的增量刷新结束"""
+    async with connection.transaction():
+        await connection.execute("SELECT pg_advisory_xact_lock(%s)", (lock_key,))
+        with timed_query("stats_rebuild", "async") as timer:
+            for statement in REBUILD_SQL:
+                await connection.execute(statement)
+            cursor = await connection.execute("SELECT count(*) FROM ai_eval_stats_ledger")
+            (settled,) = await cursor.fetchone()
+            timer.rows = settled
+    return settled
+
+
+def _bucket_order(dimension: str, bucket: Dict[str, Any]):
+    if dimension == "odds":
+        name = bucket["bucket"]
+        return (ODDS_BANDS.index(name) if name in ODDS_BANDS else len(ODDS_BANDS), name)
+    if dimension == "league":
+        return (-bucket["total"], bucket["bucket"])
+    return (bucket["bucket"] == "unknown", bucket["bucket"])
+
+
+async def load_accuracy(db, dimension: Optional[str] = None) -> Dict[str, Any]:
+    """读取汇总表，按维度分组并计算命中率"""
+    rows = await db.fetch_all(ACCURACY_QUERY, (dimension, dimension), name="accuracy_stats")
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    updated_at = None
+    for row in rows:
+        grouped.setdefault(row["dimension"], []).append({
+            "bucket": row["bucket"],
+            "total": row["total"],
+            "hits": row["hits"],
+            "hit_rate": round(row["hits"] / row["total"], 4),
+        })
+        if updated_at is None or row["updated_at"] > updated_at:
+            updated_at = row["updated_at"]
+    for name, buckets in grouped.items():
+        buckets.sort(key=lambda bucket: _bucket_order(name, bucket))
+    return {"updated_at": updated_at, "dimensions": grouped}
+
+
+class StatsRefresher:
+    """后台定期执行增量刷新
+
+    每个 worker 都运行，advisory lock 保证同一时刻只有一个在刷新，其余跳过本轮。
+    """
+
+    def __init__(self, interval: float = 60.0, lookback_days: float = 14.0, lock_key: int = 7315003, enabled: bool = True):
+        self.interval = interval
+        self.lookback_days = lookback_days
+        self.lock_key = lock_key
+        self.enabled = enabled
+        self._task: Optional[asyncio.Task] = None
+
+        # 统计信息
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_changed = 0
+        self.last_run_at: Optional[float] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "last_changed": self.last_changed,
+            "last_run_at": self.last_run_at,
+        }
+
+    async def refresh_once(self, db) -> Optional[Tuple[int, int]]:
+        async with db.pool.connection() as connection:
+            result = await refresh(connection, self.lookback_days, self.lock_key)
+        if result is None:
+            self.skipped += 1
+        else:
+            self.runs += 1
+            self.last_changed = sum(result)
+            self.last_run_at = time.time()
+            if self.last_changed:
+                logger.info(f"命中率统计增量刷新：{result[0]} 场新增或变更，{result[1]} 场撤销")
+        return result
+
+    def start(self, db) -> None:
+        """启动后台刷新任务"""
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, db) -> None:
+        while True:
+            try:
+                await self.refresh_once(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"命中率统计增量刷新失败: {e}")
+            await asyncio.sleep(self.interval)
+
+# 全局统计刷新实例
+stats_refresher = StatsRefresher(
+    interval=float(os.getenv("STATS_REFRESH_INTERVAL", "60")),
+    lookback_days=float(os.getenv("STATS_LOOKBACK_DAYS", "14")),
+    lock_key=int(os.getenv("STATS_LOCK_KEY", "7315003")),
+    enabled=os.getenv("STATS_REFRESH_ENABLED", "true").lower() == "true",
+)
+
+
+async def _main(command: str) -> int:
+    async with await psycopg.AsyncConnection.connect(autocommit=True, **_conn_kwargs()) as connection:
+        if command == "rebuild":
+            settled = await rebuild(connection, stats_refresher.lock_key)
+            logger.info(f"命中率统计已重建，计入 {settled} 场已结算比赛")
+        else:
+            result = await refresh(connection, stats_refresher.lookback_days, stats_refresher.lock_key)
+            if result is None:
+                logger.info("其它进程正在刷新，跳过")
+            else:
+                logger.info(f"增量刷新完成：{result[0]} 场新增或变更，{result[1]} 场撤销")
+    return 0
+
+
+def main(argv: List[str]) -> int:
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    command = argv[0] if argv else ""
+    if command not in ("rebuild", "refresh"):
+        print(__doc__)
+        return 2
+    return asyncio.run(_main(command))
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
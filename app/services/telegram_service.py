@@ -1,34 +1,102 @@
+from __future__ import annotations
 import logging
 import os
-import psycopg2
-import psycopg2.extras
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, Bot
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
 import asyncio
-from ..database import get_database
-from dotenv import load_dotenv
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Optional
+from ..async_database import async_database
+from ..front_database import front_database
+from ..api.ai_recommendations import recommendations_snapshot
+from .digest import render_digest, parse_digest_time, next_digest_run
+from .leader import leader_elector
+from .notifications import Delivery, DeliveryQueue
 
-# 加载环境变量
-load_dotenv()
+# python-telegram-bot 只在启用 bot 时导入（见 initialize），未配置 token 时不增加启动耗时
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import ContextTypes
+    from .broadcast import BroadcastJob
 
 logger = logging.getLogger(__name__)
 
 class TelegramService:
     def __init__(self):
+        self.enabled = os.getenv('TELEGRAM_BOT_ENABLED', 'true').lower() == 'true'
         self.bot_token = os.getenv('BOT_TOKEN')
         self.site_url = os.getenv('SITE_URL', 'http://localhost:3000')
+        # 更新接收方式：polling（长轮询）或 webhook
+        self.mode = os.getenv('TELEGRAM_MODE', 'polling').lower()
+        self.webhook_url = os.getenv('TELEGRAM_WEBHOOK_URL')
+        self.webhook_secret = os.getenv('TELEGRAM_WEBHOOK_SECRET')
+        self.update_concurrency = int(os.getenv('TELEGRAM_UPDATE_CONCURRENCY', '16'))
         self.bot_instance = None
         self.application = None
-        self.database = get_database()
+        self.database = async_database
+        self.sender = None
+        self.broadcasts = None
+        # 每日推荐推送（由 leader 定时执行）
+        self.digest_enabled = os.getenv('DIGEST_ENABLED', 'false').lower() == 'true'
+        self.digest_time = os.getenv('DIGEST_TIME', '09:00')
+        self.digest_locales = [l.strip() for l in os.getenv('DIGEST_LOCALES', 'zh,en').split(',') if l.strip()]
+        self.digest_grace_minutes = float(os.getenv('DIGEST_GRACE_MINUTES', '60'))
+        self._digest_task = None
+        # 绑定成功通知：接口在 Postgres 中按 chat_id 认领后入队，由本进程的后台 worker 经限速发送器投递
+        self.notifications = DeliveryQueue(
+            self.database,
+            self._deliver_binding_success,
+            worker_id=leader_elector.worker_id,
+            concurrency=int(os.getenv('NOTIFY_CONCURRENCY', '4')),
+            max_size=int(os.getenv('NOTIFY_QUEUE_SIZE', '10000')),
+            dedupe_ttl=float(os.getenv('NOTIFY_DEDUPE_TTL', '86400')),
+            claim_timeout=float(os.getenv('NOTIFY_CLAIM_TIMEOUT', '600')),
+        )
         
     async def initialize(self):
         """初始化 Telegram bot"""
+        if not self.enabled:
+            logger.info("Telegram bot 已禁用（TELEGRAM_BOT_ENABLED=false）")
+            return False
+
         if not self.bot_token:
             logger.error("未找到 BOT_TOKEN 环境变量")
             return False
             
+        if self.mode == 'webhook' and not (self.webhook_url and self.webhook_secret):
+            logger.error("webhook 模式需要设置 TELEGRAM_WEBHOOK_URL 和 TELEGRAM_WEBHOOK_SECRET")
+            return False
+
+        from telegram import Bot
+        from telegram.ext import Application, CommandHandler, CallbackQueryHandler
+        from .broadcast import RateLimitedSender, BroadcastManager
+            
         self.bot_instance = Bot(token=self.bot_token)
-        self.application = Application.builder().token(self.bot_token).build()
+        builder = Application.builder().token(self.bot_token).concurrent_updates(self.update_concurrency)
+        if self.mode == 'webhook':
+            # webhook 模式下不需要 Updater，更新由 FastAPI 路由写入 update_queue
+            builder = builder.updater(None)
+        self.application = builder.build()
+        
+        # 限速发送器与后台广播任务管理
+        # 限速按进程计算：广播只在 leader 上执行，其它 worker 只发送量很小的绑定通知，
+        # 多 worker 时实际总速率最多约为 TELEGRAM_GLOBAL_RATE + 各 worker 的通知速率
+        self.sender = RateLimitedSender(
+            self.bot_instance,
+            rate=float(os.getenv('TELEGRAM_GLOBAL_RATE', '25')),
+            per_chat_interval=float(os.getenv('TELEGRAM_PER_CHAT_INTERVAL', '1')),
+            max_retries=int(os.getenv('TELEGRAM_SEND_MAX_RETRIES', '3')),
+        )
+        self.broadcasts = BroadcastManager(
+            self.sender,
+            self.iter_chat_ids,
+            concurrency=int(os.getenv('BROADCAST_CONCURRENCY', '30')),
+            state_dir=os.getenv('BROADCAST_STATE_DIR', 'broadcast_jobs'),
+            progress_interval=float(os.getenv('BROADCAST_PROGRESS_INTERVAL', '10')),
+            chat_locales=self.iter_chat_locales,
+        )
+        # 在成为 leader 之前只提交任务，不执行
+        self.broadcasts.owner = False
+        self.broadcasts.on_progress = self._report_broadcast_progress
+        self.broadcasts.on_finish = self._report_broadcast_finish
         
         # 添加处理器
         self.application.add_handler(CommandHandler("start", self.start_command))
@@ -39,6 +107,7 @@ class TelegramService:
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """处理/start命令，显示欢迎消息和绑定按钮"""
+        from telegram import InlineKeyboardButton, InlineKeyboardMarkup
         user = update.effective_user
         chat_id = update.effective_chat.id
         
@@ -65,6 +134,7 @@ class TelegramService:
 
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """处理按钮点击回调（现在主要用于处理返回主菜单等操作）"""
+        from telegram import InlineKeyboardButton, InlineKeyboardMarkup
         query = update.callback_query
         user = query.from_user
         
@@ -91,8 +161,16 @@ class TelegramService:
             await query.edit_message_text(message, reply_markup=reply_markup)
             logger.info(f"用户 {user.id} 返回主菜单")
 
+    async def queue_binding_success(self, chat_id: int, user_name: str):
+        """绑定成功通知入队，返回 (投递记录, 是否新提交)；同一 chat_id 重复提交（包括落到其它 worker）不会重复发送"""
+        return await self.notifications.enqueue(f"binding-success:{chat_id}", chat_id, {"user_name": user_name})
+
+    async def _deliver_binding_success(self, delivery: Delivery) -> bool:
+        return await self.send_binding_success_message(delivery.chat_id, delivery.payload["user_name"])
+
     async def send_binding_success_message(self, chat_id: int, user_name: str) -> bool:
-        """发送绑定成功的祝贺消息"""
+        """发送绑定成功的祝贺消息（经限速发送器，与广播共用全局限速）"""
+        from telegram import InlineKeyboardButton, InlineKeyboardMarkup
         try:
             message = (
                 f"🎉 恭喜 {user_name}！\n\n"
@@ -107,11 +185,8 @@ class TelegramService:
             ]
             reply_markup = InlineKeyboardMarkup(keyboard)
             
-            await self.bot_instance.send_message(
-                chat_id=chat_id, 
-                text=message, 
-                reply_markup=reply_markup
-            )
+            if not await self.sender.send(chat_id, message, reply_markup=reply_markup):
+                return False
             logger.info(f"已向用户 {chat_id} 发送绑定成功消息")
             return True
         except Exception as e:
@@ -127,76 +202,183 @@ class TelegramService:
             await update.message.reply_text("❌ 广播内容不能为空！\n使用方法：/broadcast 您要广播的内容")
             return
         
-        # 执行广播
-        success_count = await self.broadcast_to_all_users(broadcast_content)
-        
-        # 回复发送结果
-        await update.message.reply_text(
-            f"📢 广播消息已发送！\n"
-            f"✅ 成功发送给 {success_count} 个用户"
+        # 立即回复，广播在后台执行
+        ack = await update.message.reply_text("📢 广播任务已创建，正在后台发送...")
+        job = self.broadcasts.start(
+            broadcast_content,
+            notify_chat_id=update.effective_chat.id,
+            notify_message_id=ack.message_id,
         )
+        logger.info(f"创建广播任务 {job.job_id}")
 
-    async def get_all_chat_ids(self):
-        """从用户数据库获取所有绑定的chat_id（临时连接FRONT_DATABASE_URL）"""
-        connection = None
-        try:
-            # 临时连接到用户数据库
-            front_db_url = os.getenv("FRONT_DATABASE_URL")
-            if not front_db_url:
-                logger.error("FRONT_DATABASE_URL 环境变量未设置")
-                return []
-            
-            connection = psycopg2.connect(front_db_url)
-            connection.autocommit = True
-            
-            with connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-                cursor.execute("SELECT telegram_chat_id FROM telegram_binding")
-                results = cursor.fetchall()
-                return [row['telegram_chat_id'] for row in results]
-                
-        except Exception as e:
-            logger.error(f"获取chat_id列表失败: {e}")
-            return []
-        finally:
-            if connection and not connection.closed:
-                connection.close()
-
-    async def broadcast_to_all_users(self, message: str) -> int:
-        """向所有用户广播消息"""
-        chat_ids = await self.get_all_chat_ids()
-        success_count = 0
-        
-        for chat_id in chat_ids:
+    async def _report_broadcast_progress(self, job: BroadcastJob) -> None:
+        """更新广播进度消息"""
+        if not job.notify_chat_id or not job.notify_message_id:
+            return
+        await self.bot_instance.edit_message_text(
+            chat_id=job.notify_chat_id,
+            message_id=job.notify_message_id,
+            text=(
+                f"📢 广播任务 {job.job_id} 发送中...\n"
+                f"✅ 成功 {job.sent}  ❌ 失败 {job.failed}"
+            ),
+        )
+
+    async def _report_broadcast_finish(self, job: BroadcastJob) -> None:
+        """广播结束后向发起人发送汇总"""
+        if not job.notify_chat_id:
+            return
+        status_text = "广播消息已发送！" if job.status == "completed" else f"广播任务结束（{job.status}）"
+        await self.bot_instance.send_message(
+            chat_id=job.notify_chat_id,
+            text=(
+                f"📢 {status_text}\n"
+                f"✅ 成功发送给 {job.sent} 个用户\n"
+                f"❌ 失败 {job.failed} 个用户"
+            ),
+        )
+
+    async def iter_chat_ids(self, after=None):
+        """按升序分批产出大于 after 的 chat_id，直接供广播任务消费"""
+        if not front_database.configured:
+            raise RuntimeError("FRONT_DATABASE_URL 环境变量未设置")
+        async for chat_id in front_database.iter_chat_ids(after):
+            yield chat_id
+
+    async def iter_chat_locales(self, after=None):
+        """同 iter_chat_ids，同时产出用户语言（FRONT_LOCALE_COLUMN 未设置时为 None）"""
+        if not front_database.configured:
+            raise RuntimeError("FRONT_DATABASE_URL 环境变量未设置")
+        async for chat_id, locale in front_database.iter_chat_locales(after):
+            yield chat_id, locale
+
+    async def build_digest(self) -> Dict[str, str]:
+        """每种语言查询一次推荐（与 /api/ai-recommendations 相同的选取）并渲染一次"""
+        texts = {}
+        for locale in self.digest_locales:
+            recommendations = await recommendations_snapshot(self.database, locale, "compact")
+            if recommendations:
+                texts[locale] = render_digest(locale, recommendations, self.site_url)
+        return texts
+
+    async def send_daily_digest(self, day: Optional[date] = None) -> Optional[BroadcastJob]:
+        """创建当天的推送任务；任务 id 按日期生成，同一天只推送一次（包括 leader 切换后）"""
+        day = day or date.today()
+        job_id = f"digest-{day:%Y%m%d}"
+        self.broadcasts.load_states()
+        if job_id in self.broadcasts.jobs:
+            logger.info(f"每日推送 {job_id} 已存在，跳过")
+            return None
+        texts = await self.build_digest()
+        if not texts:
+            logger.info("当前没有推荐比赛，跳过每日推送")
+            return None
+        # 语言不在 DIGEST_LOCALES 中的用户收到第一种语言的版本
+        default_text = texts.get(self.digest_locales[0]) or next(iter(texts.values()))
+        job = self.broadcasts.start(default_text, texts=texts, job_id=job_id)
+        logger.info(f"创建每日推送任务 {job_id}，语言: {list(texts)}")
+        return job
+
+    async def _digest_loop(self):
+        at = parse_digest_time(self.digest_time)
+        grace = timedelta(minutes=self.digest_grace_minutes)
+        last_day = None
+        while True:
+            run_at = next_digest_run(at, datetime.now(), grace)
+            if last_day is not None and run_at.date() <= last_day:
+                run_at = datetime.combine(last_day + timedelta(days=1), at)
+            await asyncio.sleep(max(0.0, (run_at - datetime.now()).total_seconds()))
             try:
-                await self.bot_instance.send_message(
-                    chat_id=int(chat_id),
-                    text=f"📢 系统广播\n\n{message}"
-                )
-                success_count += 1
-                logger.info(f"成功向用户 {chat_id} 发送广播消息")
-                
-                # 添加小延迟避免触发Telegram的速率限制
-                await asyncio.sleep(0.1)
-                
+                await self.send_daily_digest(run_at.date())
+                last_day = run_at.date()
             except Exception as e:
-                logger.error(f"向用户 {chat_id} 发送广播消息失败: {e}")
-                continue
-        
-        logger.info(f"广播完成，成功发送给 {success_count}/{len(chat_ids)} 个用户")
-        return success_count
+                # 在补发时限内重试
+                logger.error(f"每日推送失败: {e}")
+                await asyncio.sleep(60)
+
+    def start_digest(self):
+        """leader 启动每日推送定时任务"""
+        if self.digest_enabled and (self._digest_task is None or self._digest_task.done()):
+            self._digest_task = asyncio.create_task(self._digest_loop())
+            logger.info(f"每日推送已启用，时间 {self.digest_time}，语言 {self.digest_locales}")
+
+    async def stop_digest(self):
+        if self._digest_task is not None:
+            self._digest_task.cancel()
+            try:
+                await self._digest_task
+            except asyncio.CancelledError:
+                pass
+            self._digest_task = None
+
+    async def broadcast_to_all_users(self, message: str) -> BroadcastJob:
+        """向所有用户广播消息，等待完成并返回任务（成功数见 job.sent）
 
-    async def start_polling(self):
-        """启动 bot 轮询"""
+        本 worker 不是 leader 时任务交给 leader 执行，立即返回 status 为 queued 的任务，
+        进度用 job_id 查询（/api/telegram/broadcasts/{job_id}）
+        """
+        job = self.broadcasts.start(message)
+        return await self.broadcasts.wait(job.job_id)
+
+    async def start(self):
+        """启动 Application 与通知投递（所有 worker），轮询与广播由 leader 负责"""
         if self.application:
             await self.application.initialize()
             await self.application.start()
+            self.notifications.start()
+
+    async def become_leader(self):
+        """成为 leader：开始轮询或注册 webhook，并接管广播任务"""
+        if not self.application:
+            return
+        from telegram import Update
+        if self.mode == 'webhook':
+            await self.application.bot.set_webhook(
+                url=f"{self.webhook_url.rstrip('/')}/api/telegram/webhook",
+                secret_token=self.webhook_secret,
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=self.update_concurrency,
+            )
+            logger.info("Telegram webhook 已注册")
+        else:
             await self.application.updater.start_polling()
+            logger.info("Telegram bot 开始轮询")
+        # 继续上次未完成的广播任务，并接手其它 worker 提交的任务
+        self.broadcasts.owner = True
+        self.broadcasts.start_watching()
+        self.start_digest()
 
-    async def stop_polling(self):
-        """停止 bot 轮询"""
-        if self.application:
+    async def resign_leader(self):
+        """失去 leader 身份：停止轮询和本进程的广播任务"""
+        if not self.application:
+            return
+        if self.application.updater and self.application.updater.running:
             await self.application.updater.stop()
-            await self.application.stop()
+        await self.stop_digest()
+        self.broadcasts.owner = False
+        await self.broadcasts.shutdown()
+
+    async def process_webhook_update(self, data: dict) -> None:
+        """将 webhook 收到的更新交给 Application 处理（并发数由 concurrent_updates 限制）"""
+        from telegram import Update
+        update = Update.de_json(data, self.application.bot)
+        await self.application.update_queue.put(update)
+
+    @property
+    def webhook_ready(self) -> bool:
+        return self.mode == 'webhook' and self.application is not None and self.application.running
+
+    async def stop(self):
+        """停止 bot（轮询或 webhook）"""
+        await self.stop_digest()
+        await self.notifications.stop()
+        if self.broadcasts:
+            await self.broadcasts.shutdown()
+        if self.application:
+            if self.application.updater and self.application.updater.running:
+                await self.application.updater.stop()
+            if self.application.running:
+                await self.application.stop()
             await self.application.shutdown()
 
 # 全局 Telegram 服务实例
@@ -0,0 +1,9 @@
+"""多处查询共用的 SQL 片段"""
+
+# 十进制数字文本；JSON 中的赔率等字段可能是空字符串或其它文本
+NUMERIC_TEXT = r"^-?[0-9]+(\.[0-9]+)?$"
+
+
+def float8_or_null(expr: str) -> str:
+    """文本表达式转换为 float8，不是数字时为 NULL，而不是让整条查询报错"""
+    return f"CASE WHEN ({expr}) ~ '{NUMERIC_TEXT}' THEN ({expr})::float8 END"
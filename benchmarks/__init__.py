@@ -0,0 +1,10 @@
+"""基准测试与压测工具（不随服务部署，额外依赖见 benchmarks/requirements.txt）
+
+    pip install -r benchmarks/requirements.txt
+    python -m pytest tests
+
+    python -m benchmarks.seed --rows 50000              # 向本地 Postgres 写入合成 ai_eval 数据
+    python -m benchmarks.load --rows 50000              # 进程内用 FakeAsyncDatabase 压测 API
+    python -m benchmarks.load --url http://127.0.0.1:8000   # 压测已启动的服务（配合 seed）
+    python -m benchmarks.broadcast --chats 5000         # 假 Telegram Bot API 上测量广播吞吐与限速
+"""
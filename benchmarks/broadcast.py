@@ -0,0 +1,90 @@
+"""在假 Telegram Bot API 上测量 broadcast_to_all_users 的吞吐与限速行为
+
+发送器、广播任务与线上相同（RateLimitedSender + BroadcastManager），
+只替换 Bot API 地址与 chat_id 来源。
+
+    python -m benchmarks.broadcast --chats 2000 --rate 25 --server-rate 30
+    python -m benchmarks.broadcast --chats 2000 --rate 40      # 发送速率高于服务端限制，观察 429 处理
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+from typing import List, Optional
+from telegram import Bot
+from telegram.request import HTTPXRequest
+from app.services.broadcast import BroadcastManager, RateLimitedSender
+from app.services.telegram_service import TelegramService
+from .fake_telegram import FakeTelegramAPI, FakeTelegramServer
+from .report import print_table
+from .synthetic import chat_ids
+
+
+async def main_async(args) -> dict:
+    api = FakeTelegramAPI(
+        global_rate=args.server_rate,
+        blocked_share=args.blocked_share,
+        latency=args.latency / 1000,
+        retry_after=args.retry_after,
+    )
+    server = FakeTelegramServer(api)
+    base_url = await server.start()
+
+    ids = chat_ids(args.chats)
+
+    async def iter_chat_ids(after=None):
+        for chat_id in ids:
+            if after is None or chat_id > after:
+                yield chat_id
+
+    bot = Bot(
+        token="123456:bench",
+        base_url=base_url,
+        request=HTTPXRequest(connection_pool_size=args.connections),
+    )
+    await bot.initialize()
+    service = TelegramService()
+    service.bot_instance = bot
+    service.sender = RateLimitedSender(bot, rate=args.rate, max_retries=args.max_retries)
+    with tempfile.TemporaryDirectory() as state_dir:
+        service.broadcasts = BroadcastManager(
+            service.sender, iter_chat_ids, concurrency=args.concurrency, state_dir=state_dir,
+        )
+        start = time.perf_counter()
+        job = await service.broadcast_to_all_users("benchmark")
+        elapsed = time.perf_counter() - start
+
+    await bot.shutdown()
+    await server.stop()
+    return {
+        "chats": args.chats,
+        "sent": job.sent,
+        "elapsed_s": round(elapsed, 2),
+        "msgs_per_sec": round(args.chats / elapsed, 1),
+        **api.stats(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.ERROR)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=25.0, help="发送器全局速率（TELEGRAM_GLOBAL_RATE）")
+    parser.add_argument("--concurrency", type=int, default=30, help="广播并发数（BROADCAST_CONCURRENCY）")
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--connections", type=int, default=64, help="Bot HTTP 连接池大小")
+    parser.add_argument("--server-rate", type=float, default=30.0, help="假服务端的全局限制（条/秒）")
+    parser.add_argument("--blocked-share", type=float, default=0.02)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=50, help="假服务端往返（毫秒）")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    print_table([asyncio.run(main_async(args))], as_json=args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,173 @@
+import asyncio
+import bisect
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from app.metrics import timed_query
+
+# 与 app/api/matches.py 中 MATCHES_COLUMNS 顺序一致
+_MATCH_COLUMNS = (
+    "league_name", "home_name", "away_name", None, None, None, "fixture_date",
+    "推荐指数", "比赛预测及原因", "预测结果", "比赛是否推荐", "id",
+)
+
+
+class FakeAsyncDatabase:
+    """AsyncDatabase 的内存替身，供基准测试在没有 Postgres 时驱动 API
+
+    按查询的 name 分派到对应实现，结果的列、类型和排序与真实 SQL 一致；
+    latency 模拟网络往返，per_row_cost 模拟按返回行数增长的服务端开销。
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]], latency: float = 0.0005, per_row_cost: float = 0.0):
+        self.rows = sorted(rows, key=lambda row: (row["fixture_date"], row["id"]))
+        self._dates = [row["fixture_date"] for row in self.rows]
+        self.latency = latency
+        self.per_row_cost = per_row_cost
+        self.queries = 0
+
+    async def connect(self):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return {"fake": True, "queries": self.queries}
+
+    def _window(self, start, end) -> List[Dict[str, Any]]:
+        """fixture_date 范围扫描（对应 fixture_date 索引）"""
+        lo = bisect.bisect_left(self._dates, start)
+        hi = bisect.bisect_right(self._dates, end)
+        return self.rows[lo:hi]
+
+    async def _respond(self, name: str, result: list) -> list:
+        self.queries += 1
+        with timed_query(name, "fake") as timer:
+            delay = self.latency + self.per_row_cost * len(result)
+            if delay:
+                await asyncio.sleep(delay)
+            timer.rows = len(result)
+        return result
+
+    @staticmethod
+    def _match_tuple(row: Dict[str, Any]) -> Tuple:
+        odds = row["平均赔率"]
+        return (
+            row["league_name"], row["home_name"], row["away_name"],
+            odds.get("home_avg"), odds.get("draw_avg"), odds.get("away_avg"),
+            row["fixture_date"], float(row["推荐指数"]), row["比赛预测及原因"],
+            row["预测结果"], row["比赛是否推荐"], row["id"],
+        )
+
+    def _matches(self, params) -> List[Tuple]:
+        start, end = params
+        return [self._match_tuple(row) for row in self._window(start, end) if row["平均赔率"] is not None]
+
+    def _matches_page(self, query: str, params) -> List[Tuple]:
+        """按 _load_matches_page 拼接条件的顺序解析参数"""
+        params = list(params)
+        start, end = params.pop(0), params.pop(0)
+        leagues = params.pop(0) if "league_name = ANY" in query else None
+        recommended = "比赛是否推荐 = 1" in query
+        min_index = params.pop(0) if "推荐指数 >=" in query else None
+        after = (params.pop(0), params.pop(0)) if "(fixture_date, id) >" in query else None
+        limit = params.pop(0)
+
+        result = []
+        for row in self._window(start, end):
+            if row["平均赔率"] is None:
+                continue
+            if leagues and row["league_name"] not in leagues:
+                continue
+            if recommended and row["比赛是否推荐"] != 1:
+                continue
+            if min_index is not None and row["推荐指数"] < min_index:
+                continue
+            if after is not None and (row["fixture_date"], row["id"]) <= after:
+                continue
+            result.append(self._match_tuple(row))
+            if len(result) >= limit:
+                break
+        return result
+
+    def _recommended(self, start, end) -> List[Dict[str, Any]]:
+        candidates = [
+            row for row in self._window(start, end)
+            if row["比赛是否推荐"] == 1 and row["平均赔率"] is not None and row["reason_dict"] is not None
+        ]
+        return sorted(candidates, key=lambda row: row["推荐指数"], reverse=True)[:3]
+
+    def _recommendations(self, params) -> List[Dict[str, Any]]:
+        start, end = params
+        return [
+            {key: row[key] for key in (
+                "league_name", "home_name", "away_name", "平均赔率", "fixture_date",
+                "推荐指数", "比赛预测及原因", "预测结果", "reason_dict",
+            )}
+            for row in self._recommended(start, end)
+        ]
+
+    def _compact_recommendations(self, params) -> List[Dict[str, Any]]:
+        locale, start, end = params
+        result = []
+        for row in self._recommended(start, end):
+            reason_dict = row["reason_dict"]
+            item = {key: row[key] for key in (
+                "league_name", "home_name", "away_name", "平均赔率", "fixture_date", "推荐指数", "预测结果",
+            )}
+            item["analysis"] = reason_dict.get(locale) or reason_dict.get("zh") or row["比赛预测及原因"]
+            result.append(item)
+        return result
+
+    def _export(self, query: str, params) -> List[Tuple]:
+        """按 app/api/export.py 中 _build_query 拼接条件的顺序解析参数"""
+        params = list(params)
+        start = params.pop(0) if "fixture_date >=" in query else None
+        end = params.pop(0) if "fixture_date <=" in query else None
+        leagues = params.pop(0) if "league_name = ANY" in query else None
+        recommended = True if "比赛是否推荐 = 1" in query else False if "IS DISTINCT FROM 1" in query else None
+        lo = bisect.bisect_left(self._dates, start) if start is not None else 0
+        hi = bisect.bisect_right(self._dates, end) if end is not None else len(self.rows)
+        result = []
+        for row in self.rows[lo:hi]:
+            if leagues and row["league_name"] not in leagues:
+                continue
+            if recommended is not None and (row["比赛是否推荐"] == 1) != recommended:
+                continue
+            odds = row["平均赔率"] or {}
+            result.append((
+                row["id"], row["fixture_date"], row["league_name"], row["home_name"], row["away_name"],
+                odds.get("home_avg"), odds.get("draw_avg"), odds.get("away_avg"),
+                float(row["推荐指数"]), row["预测结果"], row["比赛是否推荐"], row["比赛预测及原因"], row["reason_dict"],
+            ))
+        return result
+
+    async def stream(self, query: str, params=None, name: str = "other", batch_size: int = 2000) -> AsyncIterator[List[Tuple]]:
+        if name != "export_ai_eval":
+            raise NotImplementedError(f"FakeAsyncDatabase 不支持查询 {name}")
+        rows = self._export(query, params)
+        for offset in range(0, len(rows), batch_size):
+            yield await self._respond(name, rows[offset:offset + batch_size])
+
+    async def fetch_rows(self, query: str, params=None, name: str = "other") -> List[Tuple]:
+        if name == "matches":
+            return await self._respond(name, self._matches(params))
+        if name == "matches_page":
+            return await self._respond(name, self._matches_page(query, params))
+        raise NotImplementedError(f"FakeAsyncDatabase 不支持查询 {name}")
+
+    async def fetch_all(self, query: str, params=None, name: str = "other") -> List[Dict[str, Any]]:
+        if name == "ai_recommendations":
+            return await self._respond(name, self._recommendations(params))
+        if name == "ai_recommendations_compact":
+            return await self._respond(name, self._compact_recommendations(params))
+        raise NotImplementedError(f"FakeAsyncDatabase 不支持查询 {name}")
+
+    async def fetch_one(self, query: str, params=None, name: str = "other") -> Optional[Dict[str, Any]]:
+        if name == "ping":
+            return (await self._respond(name, [{"test": 1}]))[0]
+        if name == "matches_count":
+            return (await self._respond(name, [{"count": len(self.rows)}]))[0]
+        raise NotImplementedError(f"FakeAsyncDatabase 不支持查询 {name}")
+
+    async def execute(self, query: str, params=None, name: str = "other") -> str:
+        raise NotImplementedError(f"FakeAsyncDatabase 不支持写入 {name}")
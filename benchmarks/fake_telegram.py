@@ -0,0 +1,162 @@
+"""假 Telegram Bot API 服务，离线测量广播吞吐与限速行为
+
+实现 getMe / sendMessage / editMessageText，按 Telegram 的限制返回错误：
+- 全局超过 global_rate 条/秒、同一聊天超过 per_chat_rate 条/秒时返回 429 与 retry_after
+- blocked_share 比例的 chat_id 返回 403（用户屏蔽了 bot）
+latency 模拟 Bot API 往返。单独运行时作为常驻服务：
+
+    python -m benchmarks.fake_telegram --port 8081
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+class FakeTelegramAPI:
+    def __init__(self, global_rate: float = 30.0, per_chat_rate: float = 1.0, blocked_share: float = 0.02,
+                 latency: float = 0.05, retry_after: int = 1, seed: int = 42):
+        self.global_rate = global_rate
+        self.per_chat_interval = 1.0 / per_chat_rate if per_chat_rate else 0.0
+        self.blocked_share = blocked_share
+        self.latency = latency
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._blocked: Dict[int, bool] = {}
+        self._recent: deque = deque()
+        self._chat_last: Dict[int, float] = {}
+        self._message_id = 0
+        self.reset_stats()
+        self.app = Starlette(routes=[Route("/bot{token}/{method}", self.handle, methods=["GET", "POST"])])
+
+    def reset_stats(self) -> None:
+        self.ok = 0
+        self.rate_limited = 0
+        self.forbidden = 0
+        self.peak_rate = 0
+        self.first_at: Optional[float] = None
+        self.last_at: Optional[float] = None
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = (self.last_at - self.first_at) if self.first_at and self.last_at else 0.0
+        return {
+            "accepted": self.ok,
+            "rate_limited_429": self.rate_limited,
+            "forbidden_403": self.forbidden,
+            "server_peak_per_sec": self.peak_rate,
+            "server_avg_per_sec": round(self.ok / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+    @staticmethod
+    def _error(code: int, description: str, **parameters) -> JSONResponse:
+        body = {"ok": False, "error_code": code, "description": description}
+        if parameters:
+            body["parameters"] = parameters
+        return JSONResponse(body, status_code=code)
+
+    async def _params(self, request: Request) -> Dict[str, Any]:
+        if request.headers.get("content-type", "").startswith("application/json"):
+            return await request.json()
+        return dict(await request.form()) or dict(request.query_params)
+
+    def _rate_limited(self, chat_id: int, now: float) -> bool:
+        while self._recent and now - self._recent[0] >= 1.0:
+            self._recent.popleft()
+        if len(self._recent) >= self.global_rate:
+            return True
+        last = self._chat_last.get(chat_id)
+        if last is not None and now - last < self.per_chat_interval:
+            return True
+        self._recent.append(now)
+        self._chat_last[chat_id] = now
+        self.peak_rate = max(self.peak_rate, len(self._recent))
+        return False
+
+    async def handle(self, request: Request) -> JSONResponse:
+        method = request.path_params["method"]
+        params = await self._params(request)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "getMe":
+            return JSONResponse({"ok": True, "result": {
+                "id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot",
+            }})
+        if method not in ("sendMessage", "editMessageText"):
+            return self._error(404, "Not Found: method not found")
+
+        chat_id = int(params["chat_id"])
+        now = time.monotonic()
+        self.first_at = self.first_at or now
+        if self._rate_limited(chat_id, now):
+            self.rate_limited += 1
+            return self._error(429, f"Too Many Requests: retry after {self.retry_after}", retry_after=self.retry_after)
+        blocked = self._blocked.get(chat_id)
+        if blocked is None:
+            blocked = self._blocked[chat_id] = self._rng.random() < self.blocked_share
+        if blocked:
+            self.forbidden += 1
+            return self._error(403, "Forbidden: bot was blocked by the user")
+
+        self.ok += 1
+        self.last_at = now
+        self._message_id += 1
+        return JSONResponse({"ok": True, "result": {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": params.get("text", ""),
+        }})
+
+
+class FakeTelegramServer:
+    """在当前事件循环中运行 FakeTelegramAPI"""
+
+    def __init__(self, api: FakeTelegramAPI, host: str = "127.0.0.1", port: int = 0):
+        self.api = api
+        self.server = uvicorn.Server(uvicorn.Config(api.app, host=host, port=port, log_level="warning", lifespan="off"))
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> str:
+        """启动并返回 Bot 使用的 base_url"""
+        self._task = asyncio.create_task(self.server.serve())
+        while not self.server.started:
+            if self._task.done():
+                self._task.result()
+            await asyncio.sleep(0.01)
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/bot"
+
+    async def stop(self) -> None:
+        self.server.should_exit = True
+        if self._task is not None:
+            await self._task
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--global-rate", type=float, default=30.0)
+    parser.add_argument("--per-chat-rate", type=float, default=1.0)
+    parser.add_argument("--blocked-share", type=float, default=0.02)
+    parser.add_argument("--latency", type=float, default=50, help="模拟往返（毫秒）")
+    args = parser.parse_args(argv)
+
+    api = FakeTelegramAPI(args.global_rate, args.per_chat_rate, args.blocked_share, args.latency / 1000)
+    print(f"base_url: http://{args.host}:{args.port}/bot")
+    uvicorn.run(api.app, host=args.host, port=args.port, log_level="warning")
+    print(json.dumps(api.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
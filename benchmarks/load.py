@@ -0,0 +1,117 @@
+"""并发压测 API，输出各场景的 p50/p90/p99 延迟与 RPS
+
+默认在进程内运行：用 FakeAsyncDatabase 替换数据库依赖，通过 ASGI 直接调用应用，
+不需要 Postgres；传入 --url 时压测已启动的服务（可先用 benchmarks.seed 写入数据）。
+
+    python -m benchmarks.load --rows 50000 --concurrency 50 --requests 2000
+    python -m benchmarks.load --cold                  # 每个请求前使快照缓存失效，测量查询+格式化路径
+    python -m benchmarks.load --url http://127.0.0.1:8000 --scenario matches
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+import httpx
+from .report import print_table, summarize
+
+# (名称, 路径, 查询参数)
+SCENARIOS: List[Tuple[str, str, Dict]] = [
+    ("matches", "/api/matches", {}),
+    ("matches_page", "/api/matches", {"limit": 50}),
+    ("matches_filtered", "/api/matches", {"league": ["英超", "西甲"], "recommended": "true", "min_index": 0.5}),
+    ("ai_recommendations", "/api/ai-recommendations", {"locale": "en"}),
+    ("ai_recommendations_compact", "/api/ai-recommendations", {"locale": "ja", "fields": "compact"}),
+]
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, path: str, params: Dict,
+                       requests: int, concurrency: int, warmup: int, cold: bool) -> Dict:
+    invalidate = None
+    if cold:
+        from app.services.snapshot_cache import snapshot_cache
+        invalidate = snapshot_cache.invalidate
+
+    for _ in range(warmup):
+        await client.get(path, params=params)
+
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            if invalidate is not None:
+                invalidate()
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                await response.aread()
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, latencies, time.perf_counter() - start, errors)
+
+
+def _in_process_client(rows: int, latency: float, per_row_cost: float) -> httpx.AsyncClient:
+    from app.async_database import get_async_database
+    from app.main import app
+    from .fake_database import FakeAsyncDatabase
+    from .synthetic import generate_rows
+
+    fake = FakeAsyncDatabase(list(generate_rows(rows)), latency=latency, per_row_cost=per_row_cost)
+    app.dependency_overrides[get_async_database] = lambda: fake
+    # ASGITransport 不触发 lifespan，不会连接真实数据库或启动 bot
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+async def main_async(args) -> List[Dict]:
+    if args.url:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30)
+    else:
+        client = _in_process_client(args.rows, args.db_latency / 1000, args.db_row_cost / 1000)
+
+    selected = [s for s in SCENARIOS if not args.scenario or s[0] in args.scenario]
+    results = []
+    async with client:
+        for name, path, params in selected:
+            results.append(await run_scenario(
+                client, name, path, params, args.requests, args.concurrency, args.warmup, args.cold,
+            ))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="压测已启动的服务，不传则进程内运行")
+    parser.add_argument("--rows", type=int, default=50000, help="进程内模式的合成 ai_eval 行数")
+    parser.add_argument("--db-latency", type=float, default=0.5, help="进程内模式每次查询的模拟往返（毫秒）")
+    parser.add_argument("--db-row-cost", type=float, default=0.002, help="进程内模式每返回一行的模拟开销（毫秒）")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000, help="每个场景的请求数")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--cold", action="store_true", help="每个请求前使快照缓存失效（仅进程内模式）")
+    parser.add_argument("--scenario", action="append", choices=[s[0] for s in SCENARIOS])
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args(argv)
+    if args.cold and args.url:
+        parser.error("--cold 只能在进程内模式使用")
+
+    print_table(asyncio.run(main_async(args)), as_json=args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
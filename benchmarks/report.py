@@ -0,0 +1,41 @@
+import json
+import math
+from typing import Any, Dict, List, Sequence
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """最近秩百分位（sorted_values 已升序）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(name: str, latencies: List[float], elapsed: float, errors: int = 0, **extra) -> Dict[str, Any]:
+    """延迟（毫秒）与吞吐汇总"""
+    values = sorted(latencies)
+    total = len(values) + errors
+    return {
+        "name": name,
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p90_ms": round(percentile(values, 90) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+        **extra,
+    }
+
+
+def print_table(results: List[Dict[str, Any]], as_json: bool = False) -> None:
+    if as_json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    if not results:
+        return
+    columns = list(results[0].keys())
+    widths = {c: max(len(c), *(len(str(r.get(c, ""))) for r in results)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for r in results:
+        print("  ".join(str(r.get(c, "")).ljust(widths[c]) for c in columns))
@@ -0,0 +1,81 @@
+"""向本地 Postgres 写入合成 ai_eval 数据
+
+连接参数与服务相同（POSTGRES_*）。表不存在时按服务用到的列建表；
+表中已有数据时拒绝写入，除非显式传入 --truncate（不要对生产库执行）。
+
+    python -m benchmarks.seed --rows 50000 [--truncate] [--migrate]
+"""
+import argparse
+import logging
+import sys
+import time
+import psycopg
+from psycopg.types.json import Jsonb
+from app.database import _conn_kwargs
+from app.migrate import apply_migrations
+from .synthetic import generate_rows
+
+logger = logging.getLogger(__name__)
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS ai_eval (
+    id BIGSERIAL PRIMARY KEY,
+    league_name TEXT,
+    home_name TEXT,
+    away_name TEXT,
+    平均赔率 JSONB,
+    fixture_date TIMESTAMP,
+    推荐指数 NUMERIC(4, 2),
+    比赛预测及原因 TEXT,
+    预测结果 TEXT,
+    比赛是否推荐 INTEGER,
+    reason_dict JSONB
+)
+"""
+
+COPY_COLUMNS = (
+    "id", "league_name", "home_name", "away_name", "平均赔率", "fixture_date",
+    "推荐指数", "比赛预测及原因", "预测结果", "比赛是否推荐", "reason_dict",
+)
+
+
+def seed(rows: int, truncate: bool = False, seed_value: int = 42) -> int:
+    with psycopg.connect(autocommit=True, **_conn_kwargs()) as connection:
+        connection.execute(CREATE_TABLE_SQL)
+        (existing,) = connection.execute("SELECT count(*) FROM ai_eval").fetchone()
+        if existing and not truncate:
+            raise SystemExit(f"ai_eval 已有 {existing} 行，确认是测试库后加 --truncate 重新写入")
+        with connection.transaction():
+            if existing:
+                connection.execute("TRUNCATE ai_eval")
+            with connection.cursor() as cursor:
+                columns = ", ".join(COPY_COLUMNS)
+                with cursor.copy(f"COPY ai_eval ({columns}) FROM STDIN") as copy:
+                    for row in generate_rows(rows, seed=seed_value):
+                        copy.write_row([
+                            Jsonb(row[column]) if column in ("平均赔率", "reason_dict") else row[column]
+                            for column in COPY_COLUMNS
+                        ])
+        connection.execute("ANALYZE ai_eval")
+    return rows
+
+
+def main(argv) -> int:
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="清空 ai_eval 后重新写入")
+    parser.add_argument("--migrate", action="store_true", help="写入后执行 app.migrate 建立索引")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    count = seed(args.rows, truncate=args.truncate, seed_value=args.seed)
+    logger.info(f"写入 {count} 行，用时 {time.perf_counter() - start:.1f}s")
+    if args.migrate:
+        logger.info(f"执行迁移: {apply_migrations()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
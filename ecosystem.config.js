@@ -2,8 +2,21 @@ module.exports = {
   apps: [
     {
       name: "betaione_backend",
-      script: "env/bin/python",
-      args: "-m uvicorn app.main:app --host 0.0.0.0 --port 8000"
+      // 启动前清空 Prometheus 多进程目录：残留的旧进程文件会让计数器重复累加
+      script: "/bin/sh",
+      args: [
+        "-c",
+        "rm -rf \"$PROMETHEUS_MULTIPROC_DIR\" && mkdir -p \"$PROMETHEUS_MULTIPROC_DIR\" && exec env/bin/python -m uvicorn app.main:app --host 0.0.0.0 --port 8000"
+      ],
+      interpreter: "none",
+      env: {
+        // uvicorn 的 worker 数；数据库连接池按它平分连接预算（见 .env.example 的 DB_MAX_CONNECTIONS）
+        WEB_CONCURRENCY: "4",
+        // 多 worker 时通过 Postgres advisory lock 选出唯一的 bot leader
+        LEADER_ELECTION: "true",
+        // 4 个 worker 的指标写入同一目录，/metrics 无论由哪个 worker 响应都返回汇总值
+        PROMETHEUS_MULTIPROC_DIR: "/tmp/betaione_prometheus"
+      }
     }
   ]
-};
\ No newline at end of file
+};
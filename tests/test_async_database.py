@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.async_database import _pool_max_size
+from app.database import Database
+
+BUDGET_ENV = (
+    "ASYNC_DB_POOL_MAX_SIZE", "DB_POOL_MAX_SIZE", "DB_POOL_MIN_SIZE",
+    "DB_MAX_CONNECTIONS", "DB_RESERVED_CONNECTIONS", "WEB_CONCURRENCY",
+)
+
+
+@pytest.fixture
+def env(monkeypatch):
+    for name in BUDGET_ENV:
+        monkeypatch.delenv(name, raising=False)
+
+    def set_env(**values):
+        for name, value in values.items():
+            monkeypatch.setenv(name, str(value))
+
+    return set_env
+
+
+def test_single_worker_uses_desired_size(env):
+    assert _pool_max_size() == 20
+    env(ASYNC_DB_POOL_MAX_SIZE=50)
+    assert _pool_max_size() == 50
+
+
+def test_pool_is_capped_by_per_worker_budget(env):
+    env(ASYNC_DB_POOL_MAX_SIZE=50, WEB_CONCURRENCY=4)
+    # (100 - 10) / 4 - 2
+    assert _pool_max_size() == 20
+    env(WEB_CONCURRENCY=8)
+    assert _pool_max_size() == 9
+    env(DB_MAX_CONNECTIONS=300)
+    assert _pool_max_size() == 34
+
+
+def test_total_connections_within_budget(env):
+    for workers in (1, 2, 4, 6, 8):
+        env(ASYNC_DB_POOL_MAX_SIZE=50, WEB_CONCURRENCY=workers)
+        assert workers * (_pool_max_size() + 2) <= 90
+
+
+def test_pool_never_below_min_size(env):
+    env(WEB_CONCURRENCY=64, DB_POOL_MIN_SIZE=2)
+    assert _pool_max_size() == 2
+
+
+class RecordingAsyncDatabase:
+    def __init__(self):
+        self.loop = None
+        self.calls = []
+
+    async def fetch_all(self, query, params=None, name="other"):
+        self.calls.append((query, params, name))
+        return [{"n": 1}]
+
+    async def fetch_one(self, query, params=None, name="other"):
+        self.calls.append((query, params, name))
+        return {"n": 1}
+
+
+def test_sync_database_runs_on_the_pool_loop():
+    async_db = RecordingAsyncDatabase()
+    db = Database(async_db)
+    with pytest.raises(RuntimeError):
+        db.fetch_all("SELECT 1")
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    async_db.loop = loop
+    try:
+        assert db.fetch_all("SELECT %s", (1,), name="test") == [{"n": 1}]
+        assert async_db.calls == [("SELECT %s", (1,), "test")]
+
+        async def from_loop():
+            db.fetch_one("SELECT 1")
+
+        # 在事件循环线程中同步调用会阻塞事件循环
+        with pytest.raises(RuntimeError):
+            asyncio.run_coroutine_threadsafe(from_loop(), loop).result()
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
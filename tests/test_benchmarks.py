@@ -0,0 +1,79 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.services.snapshot_cache import current_window
+from benchmarks.fake_database import FakeAsyncDatabase
+from benchmarks.report import percentile, summarize
+from benchmarks.synthetic import generate_rows
+
+NOW = datetime(2026, 1, 15, 15, 0)
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 90) == 90
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile(values, 0) == 1
+
+
+def test_percentile_small_samples():
+    assert percentile([], 99) == 0.0
+    assert percentile([7], 50) == 7
+    assert percentile([1, 2, 3], 50) == 2
+    assert percentile([1, 2, 3], 99) == 3
+
+
+def test_summarize():
+    latencies = [i / 1000 for i in range(100, 0, -1)]
+    result = summarize("matches", latencies, elapsed=2.0, errors=4, concurrency=8)
+    assert result == {
+        "name": "matches",
+        "requests": 104,
+        "errors": 4,
+        "rps": 52.0,
+        "p50_ms": 50.0,
+        "p90_ms": 90.0,
+        "p99_ms": 99.0,
+        "max_ms": 100.0,
+        "concurrency": 8,
+    }
+    assert summarize("empty", [], elapsed=0)["rps"] == 0.0
+
+
+@pytest.fixture(scope="module")
+def fake_db():
+    return FakeAsyncDatabase(list(generate_rows(2000, now=NOW)), latency=0)
+
+
+def test_fake_database_dispatch(fake_db):
+    start, end = current_window(NOW)
+
+    async def run():
+        assert await fake_db.fetch_one("SELECT 1 AS test", name="ping") == {"test": 1}
+        count = await fake_db.fetch_one("SELECT COUNT(*)", name="matches_count")
+        assert count == {"count": 2000}
+
+        matches = await fake_db.fetch_rows("SELECT ...", (start, end), name="matches")
+        assert matches
+        assert all(start <= row[6] <= end for row in matches)
+        assert [(row[6], row[11]) for row in matches] == sorted((row[6], row[11]) for row in matches)
+
+        page = await fake_db.fetch_rows("SELECT ... LIMIT %s", (start, end, 10), name="matches_page")
+        assert page == matches[:10]
+
+        recommendations = await fake_db.fetch_all("SELECT ...", (start, end), name="ai_recommendations")
+        assert len(recommendations) <= 3
+        indexes = [row["推荐指数"] for row in recommendations]
+        assert indexes == sorted(indexes, reverse=True)
+
+        batches = [batch async for batch in fake_db.stream("SELECT ...", (), name="export_ai_eval", batch_size=500)]
+        assert [len(batch) for batch in batches] == [500, 500, 500, 500]
+
+        with pytest.raises(NotImplementedError):
+            await fake_db.fetch_one("SELECT ...", name="unknown")
+
+    asyncio.run(run())
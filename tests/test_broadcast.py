@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+import pytest
+from telegram.error import RetryAfter
+
+from app.services import broadcast
+from app.services.broadcast import BroadcastJob, BroadcastManager, RateLimitedSender, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds):
+        # 真实的 sleep 总会让时间前进一点
+        clock.now += max(seconds, 1e-6)
+        await real_sleep(0)
+
+    monkeypatch.setattr(broadcast.time, "monotonic", clock)
+    monkeypatch.setattr(broadcast.asyncio, "sleep", sleep)
+    return clock
+
+
+def test_token_bucket_stays_under_rate_in_any_second(clock):
+    bucket = TokenBucket(25)
+    times = []
+
+    async def main():
+        for _ in range(100):
+            await bucket.acquire()
+            times.append(clock.now)
+
+    asyncio.run(main())
+    for i, start in enumerate(times):
+        assert sum(1 for t in times[i:] if t < start + 1) <= 25
+    assert times[-1] - times[0] == pytest.approx(99 / 25, abs=0.01)
+
+
+def test_token_bucket_pause_blocks_acquire(clock):
+    bucket = TokenBucket(10)
+
+    async def main():
+        await bucket.acquire()
+        bucket.pause(3)
+        start = clock.now
+        await bucket.acquire()
+        return clock.now - start
+
+    assert asyncio.run(main()) >= 3
+
+
+class FakeBot:
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, text, broadcast.time.monotonic()))
+
+
+def test_sender_spaces_messages_to_the_same_chat(clock):
+    bot = FakeBot()
+    sender = RateLimitedSender(bot, rate=100, per_chat_interval=1.0)
+
+    async def main():
+        for chat_id in (1, 2, 1):
+            assert await sender.send(chat_id, "hi")
+
+    asyncio.run(main())
+    times = {}
+    for chat_id, _, at in bot.sent:
+        times.setdefault(chat_id, []).append(at)
+    assert times[1][1] - times[1][0] >= 1.0
+    assert times[2][0] - times[1][0] < 1.0
+
+
+def test_sender_pauses_on_retry_after(clock):
+    bot = FakeBot([RetryAfter(3)])
+    sender = RateLimitedSender(bot, rate=100, per_chat_interval=0)
+
+    async def main():
+        start = clock.now
+        assert await sender.send(1, "hi")
+        return bot.sent[0][2] - start
+
+    assert asyncio.run(main()) >= 3
+
+
+def test_sender_gives_up_after_max_retries(clock):
+    bot = FakeBot([RetryAfter(1)] * 3)
+    sender = RateLimitedSender(bot, rate=100, per_chat_interval=0, max_retries=2)
+    assert asyncio.run(sender.send(1, "hi")) is False
+    assert bot.sent == []
+
+
+def test_resume_continues_after_saved_cursor(tmp_path, clock):
+    job = BroadcastJob("job1", "hello")
+    job.status = "running"
+    job.sent = 2
+    job.cursor = 2
+    (tmp_path / "job1.json").write_text(json.dumps(job.to_dict()), encoding="utf-8")
+
+    async def chat_ids(after):
+        for chat_id in range(1, 6):
+            if after is None or chat_id > after:
+                yield chat_id
+
+    bot = FakeBot()
+    manager = BroadcastManager(
+        RateLimitedSender(bot, rate=100, per_chat_interval=0), chat_ids, concurrency=2, state_dir=str(tmp_path),
+    )
+
+    async def main():
+        await manager.resume()
+        return await manager.wait("job1")
+
+    resumed = asyncio.run(main())
+    assert sorted(chat_id for chat_id, _, _ in bot.sent) == [3, 4, 5]
+    assert resumed.status == "completed"
+    assert resumed.sent == 5
+    saved = json.loads((tmp_path / "job1.json").read_text(encoding="utf-8"))
+    assert saved["status"] == "completed" and saved["cursor"] == 5
@@ -0,0 +1,221 @@
+import asyncio
+
+import psycopg
+import pytest
+from psycopg_pool import PoolClosed, PoolTimeout
+
+from app import circuit_breaker
+from app.api.errors import database_error
+from app.async_database import AsyncDatabase
+from app.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def test_opens_after_threshold(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=1.0)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.opened == 1
+
+    with pytest.raises(CircuitOpenError) as info:
+        breaker.before_call()
+    assert info.value.retry_after == pytest.approx(1.0)
+    assert breaker.rejected == 1
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_single_probe(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=1.0)
+    breaker.record_failure()
+    clock.now += 1.0
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_doubles_timeout(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=1.0, max_reset_timeout=3.0)
+    breaker.record_failure()
+    for expected in (2.0, 3.0, 3.0):
+        clock.now += 10
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.stats()["open_timeout"] == expected
+
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.stats()["open_timeout"] == 1.0
+
+
+def test_lost_probe_expires(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=1.0)
+    breaker.record_failure()
+    clock.now += 1.0
+    breaker.before_call()
+    # 探测调用被取消，没有回报结果
+    clock.now += 1.0
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+
+
+def test_async_call_retries_connection_errors():
+    db = AsyncDatabase()
+    db.guard.retry_backoff = 0
+    calls = []
+
+    async def run():
+        calls.append(1)
+        if len(calls) == 1:
+            raise psycopg.OperationalError("server closed the connection unexpectedly")
+        return "ok"
+
+    assert asyncio.run(db._call(run, retries=1)) == "ok"
+    assert len(calls) == 2
+    assert db.breaker.stats()["failures"] == 0
+
+
+def test_async_call_classifies_errors(monkeypatch):
+    db = AsyncDatabase()
+    db.guard.retry_backoff = 0
+    db.breaker.failure_threshold = 1
+    stats = {}
+    monkeypatch.setattr(db.pool, "get_stats", lambda: dict(stats))
+
+    async def call(error, retries=1):
+        attempts = []
+
+        async def run():
+            attempts.append(1)
+            raise error
+
+        with pytest.raises(type(error)):
+            await db._call(run, retries)
+        return len(attempts)
+
+    async def main():
+        # 停机中连接池已关闭：不重试，不计入熔断
+        assert await call(PoolClosed("the pool is closed")) == 1
+        assert db.breaker.state == CLOSED
+        # 连接全部被占用
+        assert await call(PoolTimeout("couldn't get a connection")) == 1
+        assert db.breaker.state == CLOSED
+        # SQL 错误说明数据库有响应
+        assert await call(psycopg.errors.SyntaxError("syntax")) == 1
+        assert db.breaker.state == CLOSED
+        # 超时期间后台新建连接失败：数据库不可达
+        stats["connections_errors"] = 3
+        assert await call(PoolTimeout("couldn't get a connection")) == 1
+        assert db.breaker.state == OPEN
+
+    asyncio.run(main())
+
+
+def test_async_concurrent_pool_timeouts_during_outage(monkeypatch):
+    db = AsyncDatabase()
+    db.breaker.failure_threshold = 5
+    stats = {}
+    monkeypatch.setattr(db.pool, "get_stats", lambda: dict(stats))
+
+    async def ok():
+        return 1
+
+    async def timeout():
+        await asyncio.sleep(0.01)
+        raise PoolTimeout("couldn't get a connection after 10.00 sec")
+
+    async def main():
+        await db._call(ok)
+        # 数据库宕机：后台重连失败一次，之后并发等待连接的请求全部超时
+        stats["connections_errors"] = 1
+        results = await asyncio.gather(*(db._call(timeout) for _ in range(5)), return_exceptions=True)
+        assert all(isinstance(r, PoolTimeout) for r in results)
+        assert db.breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            await db._call(ok)
+
+    asyncio.run(main())
+
+
+def test_async_saturation_after_recovery_is_not_a_failure(monkeypatch):
+    db = AsyncDatabase()
+    db.breaker.failure_threshold = 1
+    stats = {"connections_errors": 4, "connections_lost": 2}
+    monkeypatch.setattr(db.pool, "get_stats", lambda: dict(stats))
+
+    async def ok():
+        return 1
+
+    async def timeout():
+        raise PoolTimeout("couldn't get a connection after 10.00 sec")
+
+    async def main():
+        # 之前的故障已恢复，之后的超时只是连接全部被占用
+        await db._call(ok)
+        for _ in range(3):
+            with pytest.raises(PoolTimeout):
+                await db._call(timeout)
+        assert db.breaker.state == CLOSED
+
+    asyncio.run(main())
+
+
+def test_async_stream_uses_breaker(monkeypatch):
+    db = AsyncDatabase()
+    db.breaker.failure_threshold = 1
+
+    def connection():
+        raise psycopg.OperationalError("connection refused")
+
+    monkeypatch.setattr(db.pool, "connection", connection)
+
+    async def consume():
+        return [rows async for rows in db.stream("SELECT 1", name="test")]
+
+    async def main():
+        with pytest.raises(psycopg.OperationalError):
+            await consume()
+        assert db.breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            await consume()
+
+    asyncio.run(main())
+
+
+def test_database_error_maps_open_circuit_to_503():
+    error = database_error(CircuitOpenError("async", 1.2))
+    assert error.status_code == 503
+    assert error.headers == {"Retry-After": "2"}
+    assert database_error(RuntimeError("boom")).status_code == 500
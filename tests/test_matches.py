@@ -0,0 +1,32 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.matches import _decode_cursor, _encode_cursor
+
+
+def _cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    fixture_date = datetime(2026, 1, 1, 12, 30)
+    assert _decode_cursor(_encode_cursor(fixture_date, 42)) == (fixture_date, 42)
+
+
+@pytest.mark.parametrize("cursor", [
+    _cursor(["2026-01-01T00:00:00", {"a": 1}]),
+    _cursor(["2026-01-01T00:00:00", "x"]),
+    _cursor(["2026-01-01T00:00:00", True]),
+    _cursor(["2026-01-01T00:00:00", 1.5]),
+    _cursor(["not a date", 1]),
+    _cursor([1]),
+    "!!!",
+])
+def test_invalid_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as info:
+        _decode_cursor(cursor)
+    assert info.value.status_code == 400
@@ -0,0 +1,98 @@
+import asyncio
+
+import psycopg
+
+from app.services.notifications import DeliveryQueue
+
+
+class MissingTableDatabase:
+    """notification_deliveries 表不存在（迁移 0006 未执行）"""
+
+    def __init__(self):
+        self.queries = []
+
+    async def execute(self, query, params=None, name="other"):
+        self.queries.append(name)
+        raise psycopg.errors.UndefinedTable('relation "notification_deliveries" does not exist')
+
+    async def fetch_one(self, query, params=None, name="other"):
+        self.queries.append(name)
+        raise psycopg.errors.UndefinedTable('relation "notification_deliveries" does not exist')
+
+
+def test_falls_back_to_local_dedupe_without_table():
+    db = MissingTableDatabase()
+    sent = []
+
+    async def send(delivery):
+        sent.append(delivery.chat_id)
+        return True
+
+    async def main():
+        queue = DeliveryQueue(db, send, worker_id="test")
+        queue.start()
+        first, created = await queue.enqueue("binding-success:1", 1, {"user_name": "a"})
+        assert created and first["status"] == "queued"
+        _, created = await queue.enqueue("binding-success:1", 1, {"user_name": "a"})
+        assert not created
+        await queue.stop()
+        delivery = await queue.get("binding-success:1")
+        assert delivery["status"] == "sent"
+        return queue.stats()
+
+    stats = asyncio.run(main())
+    assert sent == [1]
+    assert stats["local_claims"] == 1
+    assert stats["duplicates"] == 1
+    assert "notification_status_update" not in db.queries
+
+
+def test_failed_local_delivery_can_be_resubmitted():
+    results = [False, True]
+
+    async def send(delivery):
+        return results.pop(0)
+
+    async def main():
+        queue = DeliveryQueue(MissingTableDatabase(), send, worker_id="test")
+        queue.start()
+        await queue.enqueue("binding-success:2", 2, {})
+        await queue._queue.join()
+        assert (await queue.get("binding-success:2"))["status"] == "failed"
+        _, created = await queue.enqueue("binding-success:2", 2, {})
+        assert created
+        await queue.stop()
+        delivery = await queue.get("binding-success:2")
+        assert (delivery["status"], delivery["attempts"]) == ("sent", 2)
+
+    asyncio.run(main())
+
+
+class ClaimThenReadFailsDatabase:
+    """认领成功，之后读取投递状态失败"""
+
+    async def execute(self, query, params=None, name="other"):
+        return "INSERT 0 1" if name == "notification_claim" else "UPDATE 1"
+
+    async def fetch_one(self, query, params=None, name="other"):
+        raise psycopg.OperationalError("server closed the connection unexpectedly")
+
+
+def test_claimed_delivery_is_accepted_when_status_read_fails():
+    sent = []
+
+    async def send(delivery):
+        sent.append(delivery.chat_id)
+        return True
+
+    async def main():
+        queue = DeliveryQueue(ClaimThenReadFailsDatabase(), send, worker_id="test")
+        queue.start()
+        delivery, created = await queue.enqueue("binding-success:3", 3, {})
+        await queue.stop()
+        return delivery, created
+
+    delivery, created = asyncio.run(main())
+    assert created
+    assert delivery["status"] == "queued"
+    assert sent == [3]
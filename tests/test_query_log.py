@@ -0,0 +1,32 @@
+import pytest
+
+from app.query_log import is_explainable, normalize_sql
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT * FROM ai_eval WHERE fixture_date >= %s",
+    "  select updated_at, deleted FROM notification_deliveries",
+    "WITH recent AS (SELECT * FROM ai_eval) SELECT count(*) FROM recent",
+    "SELECT * FROM ai_eval WHERE 预测结果 = 'insert or update'",
+])
+def test_read_only_queries_are_explainable(query):
+    assert is_explainable(query)
+
+
+@pytest.mark.parametrize("query", [
+    "INSERT INTO notification_deliveries (key) VALUES (%s)",
+    "UPDATE notification_deliveries SET status = %s",
+    "WITH moved AS (DELETE FROM ai_eval RETURNING *) SELECT count(*) FROM moved",
+    "with new as (insert into ai_eval (id) values (1) returning id) select * from new",
+    "WITH src AS (SELECT 1) MERGE INTO ai_eval USING src ON true WHEN MATCHED THEN DO NOTHING",
+    "SELECT * FROM notification_deliveries WHERE key = %s FOR UPDATE",
+    "",
+])
+def test_writes_are_not_explainable(query):
+    assert not is_explainable(query)
+
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT *\n  FROM ai_eval WHERE id = 42 AND name = 'x'") == (
+        "SELECT * FROM ai_eval WHERE id = ? AND name = ?"
+    )
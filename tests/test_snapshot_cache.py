@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.circuit_breaker import CircuitOpenError
+from app.migrate import load_migrations
+from app.services.snapshot_cache import NOTIFY_CHANNEL, SnapshotCache
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return f"value-{self.calls}"
+
+
+def test_cache_hit_and_invalidate():
+    cache = SnapshotCache(ttl=60)
+    loader = Loader()
+
+    async def main():
+        assert await cache.get("window", loader) == "value-1"
+        assert await cache.get("window", loader) == "value-1"
+        cache.invalidate()
+        assert await cache.get("window", loader) == "value-2"
+
+    asyncio.run(main())
+    assert cache.hits == 1
+    assert cache.loads == 2
+
+
+def test_concurrent_misses_load_once():
+    cache = SnapshotCache(ttl=60)
+    loader = Loader()
+
+    async def main():
+        return await asyncio.gather(*(cache.get("window", loader) for _ in range(10)))
+
+    assert asyncio.run(main()) == ["value-1"] * 10
+    assert loader.calls == 1
+    assert cache.coalesced == 9
+
+
+def test_stale_on_error_serves_last_good():
+    cache = SnapshotCache(ttl=60)
+    loader = Loader()
+
+    async def main():
+        assert await cache.get("window", loader) == "value-1"
+        cache.invalidate()
+        loader.error = CircuitOpenError("async", 1.0)
+        assert await cache.get("window", loader, stale_on_error=True) == "value-1"
+        with pytest.raises(CircuitOpenError):
+            await cache.get("window", loader)
+        loader.error = None
+        assert await cache.get("window", loader, stale_on_error=True) == "value-4"
+
+    asyncio.run(main())
+    assert cache.stale_served == 1
+    assert cache.load_errors == 2
+
+
+def test_stale_on_error_without_last_good_raises():
+    cache = SnapshotCache(ttl=60)
+    loader = Loader()
+    loader.error = ConnectionError("down")
+
+    async def main():
+        with pytest.raises(ConnectionError):
+            await cache.get("other", loader, stale_on_error=True)
+
+    asyncio.run(main())
+
+
+def test_notify_channel_matches_migration():
+    migrations = dict(load_migrations())
+    assert f"pg_notify('{NOTIFY_CHANNEL}', TG_OP)" in migrations["0003_ai_eval_notify_trigger"]
@@ -0,0 +1,61 @@
+import re
+from datetime import datetime
+
+import pytest
+
+from app.api.export import _build_query
+from app.api.matches import MATCHES_COLUMNS, _format_matches
+from app.services.stats import REBUILD_SQL, REFRESH_SQL, SETTLED_SQL
+from app.sql import NUMERIC_TEXT, float8_or_null
+
+# Postgres 的 ~ 与 Python re.search 对该模式的语义一致
+_numeric = re.compile(NUMERIC_TEXT)
+
+
+@pytest.mark.parametrize("value", ["1.85", "2", "-0.5", "10.00"])
+def test_numeric_odds_are_cast(value):
+    assert _numeric.search(value)
+
+
+@pytest.mark.parametrize("value", ["", " ", "abc", "1.5.2", "-", ".5", "1,85", "N/A", "1.85 "])
+def test_bad_odds_become_null(value):
+    assert not _numeric.search(value)
+
+
+def test_float8_or_null():
+    assert float8_or_null("x->>'a'") == (
+        "CASE WHEN (x->>'a') ~ '^-?[0-9]+(\\.[0-9]+)?$' THEN (x->>'a')::float8 END"
+    )
+
+
+def _unguarded_casts(query: str):
+    """去掉受保护的转换后剩下的 JSON 文本 ::float8 转换"""
+    query = re.sub(r"CASE WHEN \((.+?)\) ~ '[^']*' THEN \(\1\)::float8 END", "?", query)
+    return re.findall(r"->>[^,\n]*::float8", query)
+
+
+def test_settled_odds_cast_is_guarded():
+    # 一场 平均赔率 为空字符串或非数字的已结算比赛不能让增量刷新和全量重建失败
+    picked = float8_or_null("e.平均赔率->>(e.预测结果 || '_avg')")
+    assert picked in SETTLED_SQL
+    for query in (SETTLED_SQL, REFRESH_SQL, *REBUILD_SQL):
+        assert _unguarded_casts(query) == []
+
+
+def test_export_odds_cast_is_guarded():
+    query, _ = _build_query(None, None, None, None)
+    assert _unguarded_casts(query) == []
+    assert query.count("::float8 END") == 3
+
+
+def test_matches_odds_cast_is_guarded():
+    # 平均赔率 中的空字符串或非数字不能让整个 /api/matches 时间窗口返回 500
+    assert _unguarded_casts(MATCHES_COLUMNS) == []
+    assert MATCHES_COLUMNS.count("::float8 END") == 3
+
+
+def test_matches_missing_odds_format_as_zero():
+    fixture_date = datetime(2026, 1, 15, 20, 0)
+    row = ("League", "Home", "Away", None, 3.456, None, fixture_date, 0.8, "", "home", 1, 1)
+    match = _format_matches([row])[0]
+    assert (match["home_odds"], match["draw_odds"], match["away_odds"]) == (0, 3.46, 0)